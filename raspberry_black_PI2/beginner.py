@@ -0,0 +1,374 @@
+"""
+Beginner Engine
+Small in-process engine for levels below Stockfish's Elo floor (1350), so
+kids get an opponent they can beat and the move comes back in milliseconds
+without a UCI round trip.
+
+It is a shallow alpha-beta search over python-chess move generation with a
+material plus piece-square-table evaluation. The tables are folded into one
+lookup per colour, piece and square when the module loads, and a small
+transposition table is kept between moves. Strength comes from the search
+depth, whether captures are followed to the end, and random noise added to
+the root moves: lots of noise at the bottom, almost none near 1350.
+
+Python move generation is slow, so every move has a node and time budget.
+The search deepens one ply at a time and plays from the deepest iteration
+that finished inside the budget.
+"""
+
+import random
+import threading
+import time
+from collections import Counter
+
+import chess
+import chess.polyglot
+
+
+MIN_ELO = 100
+MAX_ELO = 1349
+MATE_SCORE = 100000
+
+PIECE_VALUES = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 320,
+    chess.BISHOP: 330,
+    chess.ROOK: 500,
+    chess.QUEEN: 900,
+    chess.KING: 0
+}
+
+# Piece-square tables from white's side, rank 8 first as on a diagram
+_PST_ROWS = {
+    chess.PAWN: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0
+    ],
+    chess.KNIGHT: [
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50
+    ],
+    chess.BISHOP: [
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20
+    ],
+    chess.ROOK: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0
+    ],
+    chess.QUEEN: [
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20
+    ],
+    chess.KING: [
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20
+    ]
+}
+
+
+def _build_tables():
+    # TABLES[color][piece_type][square] = material + placement, squares numbered a1=0 as in python-chess
+    tables = {}
+    for color in chess.COLORS:
+        tables[color] = {}
+        for piece_type, rows in _PST_ROWS.items():
+            table = []
+            for square in chess.SQUARES:
+                white_square = square if color == chess.WHITE else chess.square_mirror(square)
+                row = 7 - chess.square_rank(white_square)
+                table.append(PIECE_VALUES[piece_type] + rows[row * 8 + chess.square_file(white_square)])
+            tables[color][piece_type] = table
+    return tables
+
+
+TABLES = _build_tables()
+
+
+def evaluate(board):
+    """Material and placement from the side to move's point of view, in centipawns"""
+    score = 0
+    for piece_type in chess.PIECE_TYPES:
+        white_table = TABLES[chess.WHITE][piece_type]
+        black_table = TABLES[chess.BLACK][piece_type]
+        for square in chess.scan_forward(board.pieces_mask(piece_type, chess.WHITE)):
+            score += white_table[square]
+        for square in chess.scan_forward(board.pieces_mask(piece_type, chess.BLACK)):
+            score -= black_table[square]
+    return score if board.turn == chess.WHITE else -score
+
+
+def move_gain(board, move):
+    """How much evaluate() goes up for the side to move when it plays move, without playing it"""
+    us = board.turn
+    ours = TABLES[us]
+    piece_type = board.piece_type_at(move.from_square)
+    gain = ours[move.promotion or piece_type][move.to_square] - ours[piece_type][move.from_square]
+    if board.is_castling(move):
+        rank = chess.square_rank(move.from_square)
+        if chess.square_file(move.to_square) > chess.square_file(move.from_square):
+            gain += ours[chess.ROOK][chess.square(5, rank)] - ours[chess.ROOK][chess.square(7, rank)]
+        else:
+            gain += ours[chess.ROOK][chess.square(3, rank)] - ours[chess.ROOK][chess.square(0, rank)]
+    elif board.is_en_passant(move):
+        captured_square = move.to_square - 8 if us == chess.WHITE else move.to_square + 8
+        gain += TABLES[not us][chess.PAWN][captured_square]
+    else:
+        captured = board.piece_type_at(move.to_square)
+        if captured:
+            gain += TABLES[not us][captured][move.to_square]
+    return gain
+
+
+def _capture_value(board, move):
+    # Most valuable victim, least valuable attacker first
+    victim = board.piece_type_at(move.to_square) or chess.PAWN
+    attacker = board.piece_type_at(move.from_square)
+    return PIECE_VALUES[victim] * 10 - PIECE_VALUES[attacker]
+
+
+def _good_captures(board):
+    # Captures that do not simply give material away: a bigger victim, or a square nobody defends.
+    # Pseudo-legal, the caller drops the ones that leave the king in check once it has played them
+    them = not board.turn
+    for move in board.generate_pseudo_legal_captures():
+        victim = board.piece_type_at(move.to_square) or chess.PAWN
+        attacker = board.piece_type_at(move.from_square)
+        if PIECE_VALUES[victim] >= PIECE_VALUES[attacker] or not board.is_attacked_by(them, move.to_square):
+            yield move
+
+
+def _ordered(board, moves, first=None):
+    captures = []
+    quiet = []
+    for move in moves:
+        if move == first:
+            continue
+        (captures if board.is_capture(move) else quiet).append(move)
+    captures.sort(key=lambda m: -_capture_value(board, m))
+    return ([first] if first in moves else []) + captures + quiet
+
+
+def _repetition_keys(board):
+    """How often each position since the last capture or pawn move has occurred"""
+    # _transposition_key is the key python-chess's own repetition checks use, far cheaper than a Zobrist hash
+    keys = Counter()
+    if board.halfmove_clock < 4:
+        return keys
+    position = board.copy()
+    for _ in range(min(position.halfmove_clock, len(position.move_stack))):
+        position.pop()
+        keys[position._transposition_key()] += 1
+    return keys
+
+
+class _OutOfBudget(Exception):
+    pass
+
+
+class BeginnerEngine:
+    def __init__(self, tt_size=50000, quiescence_depth=3, max_nodes=3000, max_time=0.03, seed=None):
+        self.tt_size = tt_size
+        self.quiescence_depth = quiescence_depth
+        self.max_nodes = max_nodes
+        self.max_time = max_time
+        self._tt = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._nodes = 0
+        self._deadline = None
+
+        # Metrics
+        self.moves = 0
+        self.total_nodes = 0
+        self.cut_short = 0
+
+    def settings(self, elo):
+        """(depth, quiescence, noise in centipawns) for elo"""
+        level = (max(MIN_ELO, min(MAX_ELO, elo)) - MIN_ELO) / (MAX_ELO - MIN_ELO)
+        depth = 1 if level < 0.4 else 2
+        quiescence = level >= 0.7
+        noise = 20 + 400 * (1 - level) ** 2
+        return depth, quiescence, noise
+
+    def _count_node(self):
+        self._nodes += 1
+        # The clock is only read every 64 nodes
+        if self._deadline is not None and (self._nodes >= self.max_nodes or
+                                           (self._nodes % 64 == 0 and time.perf_counter() > self._deadline)):
+            raise _OutOfBudget()
+
+    def _quiescence(self, board, score, alpha, beta, depth, ply):
+        # Follow captures until the position is quiet, score is the side to move's evaluation.
+        # In check there is no standing pat: every evasion is searched, and none is mate
+        self._count_node()
+        in_check = depth == self.quiescence_depth and board.is_check()
+        if not in_check:
+            if score >= beta or depth == 0:
+                return score
+            alpha = max(alpha, score)
+            moves = _ordered(board, list(_good_captures(board)))
+        else:
+            moves = _ordered(board, list(board.legal_moves))
+            if not moves:
+                return -MATE_SCORE + ply
+            alpha = max(alpha, -MATE_SCORE + ply)
+        for move in moves:
+            child_score = -(score + move_gain(board, move))
+            board.push(move)
+            if board.was_into_check():
+                board.pop()
+                continue
+            result = -self._quiescence(board, child_score, -beta, -alpha, max(depth - 1, 0), ply + 1)
+            board.pop()
+            if result >= beta:
+                return result
+            alpha = max(alpha, result)
+        return alpha
+
+    def _search(self, board, score, depth, alpha, beta, ply, quiescence):
+        if depth == 0:
+            # Mates at the horizon are only seen by the levels with quiescence, which handles check.
+            # Below that a checking move is scored like any other, as a beginner would
+            if quiescence:
+                return self._quiescence(board, score, alpha, beta, self.quiescence_depth, ply)
+            self._count_node()
+            return score
+        self._count_node()
+        if board.halfmove_clock >= 100:
+            return 0
+        moves = list(board.legal_moves)
+        if not moves:
+            # Sooner mates score higher
+            return -MATE_SCORE + ply if board.is_check() else 0
+
+        key = (chess.polyglot.zobrist_hash(board), quiescence)
+        entry = self._tt.get(key)
+        best_move = None
+        if entry:
+            entry_depth, entry_score, entry_flag, best_move = entry
+            if entry_depth >= depth:
+                if entry_flag == 0 or (entry_flag > 0 and entry_score >= beta) or (entry_flag < 0 and entry_score <= alpha):
+                    return entry_score
+
+        original_alpha = alpha
+        best_score = -MATE_SCORE - 1
+        for move in _ordered(board, moves, best_move):
+            child_score = -(score + move_gain(board, move))
+            board.push(move)
+            result = -self._search(board, child_score, depth - 1, -beta, -alpha, ply + 1, quiescence)
+            board.pop()
+            if result > best_score:
+                best_score, best_move = result, move
+            alpha = max(alpha, result)
+            if alpha >= beta:
+                break
+
+        # flag: 1 lower bound (cut off), -1 upper bound (nothing beat alpha), 0 exact
+        flag = 1 if best_score >= beta else -1 if best_score <= original_alpha else 0
+        if len(self._tt) >= self.tt_size:
+            self._tt.clear()
+        self._tt[key] = (depth, best_score, flag, best_move)
+        return best_score
+
+    def _search_root(self, position, root, depth, quiescence, scores):
+        # Every root move gets a full score so the noise can promote any of them, not just the best few.
+        # Scores are updated in place, a search cut short leaves the moves it reached at the new depth
+        for move, child_score, drawn in root:
+            if drawn:
+                scores[move] = 0
+                continue
+            position.push(move)
+            try:
+                scores[move] = -self._search(position, child_score, depth - 1, -MATE_SCORE - 1, MATE_SCORE + 1, 1,
+                                             quiescence)
+            finally:
+                position.pop()
+
+    def play(self, board, elo):
+        """Pick a move for board at elo (MIN_ELO..MAX_ELO), returns (move, info)"""
+        depth, quiescence, noise = self.settings(elo)
+        with self._lock:
+            self._nodes = 0
+            position = board.copy()
+            root_score = evaluate(position)
+            # Repetitions are looked up in one table built per move, not by replaying the game for every root move
+            seen = _repetition_keys(position)
+            root = []
+            for move in _ordered(position, list(position.legal_moves)):
+                child_score = -(root_score + move_gain(position, move))
+                position.push(move)
+                # A capture or pawn move cannot repeat anything
+                drawn = position.halfmove_clock >= 100 or (
+                    bool(seen) and position.halfmove_clock > 0 and seen[position._transposition_key()] >= 2)
+                position.pop()
+                root.append((move, child_score, drawn))
+            if not root:
+                return None, {}
+
+            # Until a search reaches it each move is worth what it wins on the spot
+            scores = {move: -child_score for move, child_score, _ in root}
+            searched = 0
+            self._deadline = time.perf_counter() + self.max_time
+            try:
+                for iteration in range(1, depth + 1):
+                    self._search_root(position, root, iteration, quiescence, scores)
+                    searched = iteration
+                    # The next iteration starts from the best moves so far, so a cut short one covers those
+                    root.sort(key=lambda item: -scores[item[0]])
+            except _OutOfBudget:
+                self.cut_short += 1
+            finally:
+                self._deadline = None
+
+            scored = [(scores[move] + self._random.gauss(0, noise), scores[move], move) for move, _, _ in root]
+            _, score, move = max(scored, key=lambda item: item[0])
+            self.moves += 1
+            self.total_nodes += self._nodes
+            return move, {'depth': searched, 'nodes': self._nodes, 'score': score, 'noise': round(noise)}
+
+    def stats(self):
+        """Move and node counters for /api/status"""
+        with self._lock:
+            return {
+                'moves': self.moves,
+                'avg_nodes': round(self.total_nodes / self.moves) if self.moves else None,
+                'cut_short': self.cut_short,
+                'tt_entries': len(self._tt)
+            }
@@ -0,0 +1,204 @@
+"""
+Personality Book Builder
+Offline tool that writes one Polyglot opening book per NNUE personality, so
+each one opens the way its own network plays instead of from a generic book
+that makes them all look alike.
+
+The positions come from the common openings: every prefix of the mainlines
+below, plus (when it exists) the positions the generic book reaches within
+--plies plies following its top --width moves. Each personality's engine
+searches every position to a fixed depth with MultiPV in parallel worker
+processes. Moves within --margin centipawns of the best become book moves,
+weighted by their score. Each personality's book is written to
+books/<model>.bin, which the server loads when that nnue_model is playing.
+
+    python book_builder.py --depth 18 --plies 12 --workers 3
+"""
+
+import argparse
+import math
+import multiprocessing
+import os
+import struct
+import time
+
+import chess
+import chess.engine
+import chess.polyglot
+
+from engine_workers import close_engines, discard_engine, init_worker, worker_engine
+from nnue_models import NNUE_BASE_DIR, NNUE_FILES, nnue_path
+
+
+STOCKFISH_PATH = "/usr/games/stockfish"
+BOOK_BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'books'))
+# Mainlines of the most played openings, every position along them gets book moves
+MAINLINES = [
+    "e4 e5 Nf3 Nc6 Bb5 a6 Ba4 Nf6 O-O Be7 Re1 b5 Bb3",
+    "e4 e5 Nf3 Nc6 Bc4 Bc5 c3 Nf6 d4 exd4",
+    "e4 e5 Nf3 Nc6 d4 exd4 Nxd4 Nf6 Nxc6 bxc6",
+    "e4 e5 Nf3 Nf6 Nxe5 d6 Nf3 Nxe4 d4",
+    "e4 c5 Nf3 d6 d4 cxd4 Nxd4 Nf6 Nc3 a6 Be3",
+    "e4 c5 Nf3 Nc6 d4 cxd4 Nxd4 Nf6 Nc3 e5",
+    "e4 c5 Nf3 e6 d4 cxd4 Nxd4 Nc6 Nc3 Qc7",
+    "e4 e6 d4 d5 Nc3 Nf6 Bg5 Be7 e5 Nfd7",
+    "e4 c6 d4 d5 Nc3 dxe4 Nxe4 Bf5 Ng3 Bg6",
+    "e4 d5 exd5 Qxd5 Nc3 Qa5 d4 Nf6",
+    "d4 d5 c4 e6 Nc3 Nf6 Bg5 Be7 e3 O-O Nf3",
+    "d4 d5 c4 c6 Nf3 Nf6 Nc3 dxc4 a4 Bf5",
+    "d4 d5 c4 dxc4 Nf3 Nf6 e3 e6 Bxc4 c5",
+    "d4 Nf6 c4 e6 Nc3 Bb4 e3 O-O Bd3 d5",
+    "d4 Nf6 c4 g6 Nc3 Bg7 e4 d6 Nf3 O-O Be2 e5",
+    "d4 Nf6 c4 e6 Nf3 b6 g3 Ba6 b3",
+    "d4 Nf6 c4 c5 d5 e6 Nc3 exd5 cxd5 d6",
+    "d4 d5 Nf3 Nf6 Bf4 e6 e3 c5 c3 Nc6",
+    "c4 e5 Nc3 Nf6 Nf3 Nc6 g3 d5 cxd5 Nxd5",
+    "Nf3 d5 g3 Nf6 Bg2 e6 O-O Be7 d3"
+]
+
+def opening_positions(plies, width, source_book=None):
+    """FENs of the common opening positions, transpositions counted once"""
+    positions = {}
+    # Positions the book walk has reached, a mainline position still gets its book moves followed
+    visited = set()
+
+    def add(board):
+        if board.ply() < plies and not board.is_game_over():
+            positions.setdefault(chess.polyglot.zobrist_hash(board), board.fen())
+
+    for line in MAINLINES:
+        board = chess.Board()
+        add(board)
+        for san in line.split():
+            board.push_san(san)
+            add(board)
+
+    if source_book and os.path.exists(source_book):
+        with chess.polyglot.open_reader(source_book) as reader:
+            frontier = [chess.Board()]
+            for _ in range(plies):
+                next_frontier = []
+                for board in frontier:
+                    entries = sorted(reader.find_all(board), key=lambda e: -e.weight)[:width]
+                    for entry in entries:
+                        child = board.copy(stack=False)
+                        child.push(entry.move)
+                        key = chess.polyglot.zobrist_hash(child)
+                        if key not in visited and child.ply() < plies:
+                            visited.add(key)
+                            next_frontier.append(child)
+                        add(child)
+                frontier = next_frontier
+    return list(positions.values())
+
+
+def _engine(engine_path, model, eval_file, threads, hash_mb):
+    close_engines(keep=(model,))
+    return worker_engine(engine_path, model, {"EvalFile": eval_file, "Threads": threads, "Hash": hash_mb})
+
+
+def search_position(task):
+    """MultiPV search of one position for one personality in a worker, returns (model, fen, [(move, cp)])"""
+    engine_path, model, eval_file, fen, depth, multipv, threads, hash_mb = task
+    board = chess.Board(fen)
+    try:
+        infos = _engine(engine_path, model, eval_file, threads, hash_mb).analyse(
+            board, chess.engine.Limit(depth=depth), multipv=multipv,
+            info=chess.engine.INFO_SCORE | chess.engine.INFO_PV)
+    except chess.engine.EngineError as e:
+        discard_engine(model)
+        print(f"{model} failed on {fen}: {e}")
+        return model, fen, []
+    lines = [(info['pv'][0], info['score'].relative.score(mate_score=100000))
+             for info in infos if info.get('pv') and 'score' in info]
+    return model, fen, lines
+
+
+def book_moves(lines, margin):
+    """(move, weight) for the moves within margin centipawns of the best, the best weighted highest"""
+    if not lines:
+        return []
+    best = max(score for _, score in lines)
+    # Each 25cp behind the best halves a move's weight
+    return [(move, max(1, int(1000 * math.pow(2, -(best - score) / 25))))
+            for move, score in lines if best - score <= margin]
+
+
+def polyglot_move(board, move):
+    """A move in Polyglot's 16 bit encoding, castling is written as the king taking its rook"""
+    to_square = move.to_square
+    if board.is_castling(move):
+        rook_file = 7 if board.is_kingside_castling(move) else 0
+        to_square = chess.square(rook_file, chess.square_rank(move.from_square))
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | (move.from_square << 6) | (promotion << 12)
+
+
+def write_book(path, entries):
+    """Write (board, move, weight) entries as a Polyglot .bin, sorted by position key as readers expect"""
+    records = sorted((chess.polyglot.zobrist_hash(board), polyglot_move(board, move), weight)
+                     for board, move, weight in entries)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        for key, move, weight in records:
+            f.write(struct.pack(">QHHI", key, move, min(weight, 0xFFFF), 0))
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a Polyglot opening book for each NNUE personality")
+    parser.add_argument('--models', default=','.join(NNUE_FILES), help="comma separated personalities")
+    parser.add_argument('--nnue-dir', default=NNUE_BASE_DIR)
+    parser.add_argument('--depth', type=int, default=16, help="search depth for every position")
+    parser.add_argument('--multipv', type=int, default=3, help="candidate moves searched per position")
+    parser.add_argument('--margin', type=int, default=30, help="centipawns behind the best a book move may be")
+    parser.add_argument('--plies', type=int, default=12, help="deepest opening position in the book")
+    parser.add_argument('--width', type=int, default=3, help="source book moves followed per position")
+    parser.add_argument('--source-book', default=os.path.join(BOOK_BASE_DIR, 'opening.bin'),
+                        help="generic Polyglot book whose popular lines add positions")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument('--threads', type=int, default=1, help="Threads per engine")
+    parser.add_argument('--hash', type=int, default=64, help="Hash per engine (MB)")
+    parser.add_argument('--stockfish', default=STOCKFISH_PATH)
+    parser.add_argument('--output-dir', default=BOOK_BASE_DIR)
+    args = parser.parse_args()
+
+    models = []
+    for model in args.models.split(','):
+        if os.path.exists(nnue_path(model, args.nnue_dir)):
+            models.append(model)
+        else:
+            print(f"Skipping {model}: {nnue_path(model, args.nnue_dir)} not found")
+    if not models:
+        print("No personality networks found")
+        return
+    fens = opening_positions(args.plies, args.width, args.source_book)
+    # Grouped by personality, so a worker keeps the same network loaded from one task to the next
+    tasks = [(args.stockfish, model, nnue_path(model, args.nnue_dir), fen, args.depth, args.multipv,
+              args.threads, args.hash) for model in models for fen in fens]
+    print(f"{len(fens)} positions x {len(models)} personalities on {args.workers} workers, depth {args.depth}")
+
+    started = time.time()
+    entries = {model: [] for model in models}
+    pool = multiprocessing.Pool(args.workers, initializer=init_worker)
+    try:
+        for done, (model, fen, lines) in enumerate(pool.imap_unordered(search_position, tasks, chunksize=4), 1):
+            board = chess.Board(fen)
+            entries[model].extend((board, move, weight) for move, weight in book_moves(lines, args.margin))
+            if done % 50 == 0 or done == len(tasks):
+                print(f"{done}/{len(tasks)} positions searched")
+    finally:
+        pool.close()
+        pool.join()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for model in models:
+        path = os.path.join(args.output_dir, f'{model}.bin')
+        count = write_book(path, entries[model])
+        print(f"{model}: {count} book moves written to {path} ({os.path.getsize(path) // 1024} KB)")
+    print(f"Done in {time.time() - started:.0f}s")
+
+
+if __name__ == '__main__':
+    main()
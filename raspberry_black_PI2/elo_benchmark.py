@@ -0,0 +1,235 @@
+"""
+Elo Benchmark
+Offline tool that measures what each set-bot-difficulty combination really
+plays like on this Pi. Every configuration (Elo x Skill Level x NNUE file in
+NNUE_BASE_DIR) plays a gauntlet of games against an anchor configuration in
+parallel worker processes. The report gives each configuration's Elo
+relative to the anchor with a 95% interval, and the distribution of its
+per-move latency.
+
+Run it with the chess server stopped, so the engines get the whole Pi:
+
+    python elo_benchmark.py --elos 1350,1600,2000 --skills 10,20 --games 20 --output report.json
+
+The report is JSON with sorted keys so two runs can be diffed.
+"""
+
+import argparse
+import glob
+import json
+import math
+import multiprocessing
+import os
+import platform
+import time
+
+import chess
+import chess.engine
+
+from engine_workers import close_engines, discard_engine, init_worker, worker_engine
+from nnue_models import NNUE_BASE_DIR
+from telemetry import percentile
+
+
+STOCKFISH_PATH = "/usr/games/stockfish"
+# Every game pair starts from one of these, each side gets both colours
+OPENING_FENS = [
+    chess.STARTING_FEN,
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkbnr/ppp1pppp/8/3p4/3P4/8/PPP1PPPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkb1r/pppppppp/5n2/8/3P4/8/PPP1PPPP/RNBQKBNR w KQkq - 1 2",
+    "rnbqkbnr/pppppppp/8/8/2P5/8/PP1PPPPP/RNBQKBNR b KQkq - 0 1"
+]
+# Games longer than this many plies are scored as draws
+MAX_PLIES = 300
+
+def configurations(elos, skills, nnue_files):
+    """Every (name, UCI options) combination to benchmark"""
+    configs = []
+    for eval_file in nnue_files:
+        net = os.path.splitext(os.path.basename(eval_file))[0] if eval_file else 'default'
+        for elo in elos:
+            for skill in skills:
+                config = {"UCI_LimitStrength": True, "UCI_Elo": elo, "Skill Level": skill,
+                          "Threads": 1, "Hash": 16}
+                if eval_file:
+                    config["EvalFile"] = eval_file
+                configs.append((f"elo{elo}-skill{skill}-{net}", config))
+    return configs
+
+
+def play_game(task):
+    """Play one game in a worker, returns the score for the tested side and both sides' move times"""
+    engine_path, tested, anchor, fen, tested_white, movetime = task
+    sides = {chess.WHITE: tested if tested_white else anchor, chess.BLACK: anchor if tested_white else tested}
+    board = chess.Board(fen)
+    times = {tested[0]: [], anchor[0]: []}
+    limit = chess.engine.Limit(time=movetime)
+    # The engines are reused from earlier games, a new game object makes python-chess send ucinewgame
+    game = object()
+    close_engines(keep=times)
+    try:
+        while not board.is_game_over(claim_draw=True) and board.ply() < MAX_PLIES:
+            name, config = sides[board.turn]
+            engine = worker_engine(engine_path, name, config)
+            start = time.time()
+            result = engine.play(board, limit, game=game)
+            times[name].append(time.time() - start)
+            board.push(result.move)
+    except chess.engine.EngineError as e:
+        # A crashed engine loses the game, start it again for the next one
+        name = sides[board.turn][0]
+        discard_engine(name)
+        print(f"{name} failed: {e}")
+        return tested[0], 0.0 if sides[board.turn] is tested else 1.0, times
+    outcome = board.outcome(claim_draw=True)
+    if outcome is None or outcome.winner is None:
+        score = 0.5
+    else:
+        score = 1.0 if (outcome.winner == chess.WHITE) == tested_white else 0.0
+    return tested[0], score, times
+
+
+def _to_elo(p):
+    # A score of 0 or 1 is an unbounded Elo difference, None
+    if p <= 0 or p >= 1:
+        return None
+    # "or 0.0" turns an even score's -0.0 into 0.0
+    return round(-400 * math.log10(1 / p - 1), 1) or 0.0
+
+
+def elo_estimate(scores):
+    """Elo difference and its 95% interval (low, high) from a list of game scores (1, 0.5, 0)
+    The interval is the Wilson score interval on the mean score, so it stays honest for all
+    wins, all losses or all draws. Unbounded ends (and the Elo of a 0 or 1 score) are None
+    """
+    games = len(scores)
+    mean = sum(scores) / games
+    z = 1.96
+    centre = (mean + z * z / (2 * games)) / (1 + z * z / games)
+    spread = z * math.sqrt(mean * (1 - mean) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+    return _to_elo(mean), _to_elo(centre - spread), _to_elo(centre + spread)
+
+
+def latency_summary(times):
+    """Move time percentiles in milliseconds"""
+    values = sorted(t * 1000 for t in times)
+    if not values:
+        return None
+    return {
+        'moves': len(values),
+        'mean': round(sum(values) / len(values), 1),
+        'p50': round(percentile(values, 50), 1),
+        'p90': round(percentile(values, 90), 1),
+        'p99': round(percentile(values, 99), 1),
+        'max': round(values[-1], 1)
+    }
+
+
+def run(args):
+    elos = [int(e) for e in args.elos.split(',')]
+    skills = [int(s) for s in args.skills.split(',')]
+    nnue_files = [None] if args.include_default else []
+    nnue_files += sorted(glob.glob(os.path.join(args.nnue_dir, '*.nnue')))
+    configs = configurations(elos, skills, nnue_files)
+    if not configs:
+        raise ValueError("no configurations to benchmark")
+    if args.anchor is None:
+        anchor = configs[0]
+    else:
+        anchor = next((c for c in configs if c[0] == args.anchor), None)
+        if anchor is None:
+            raise ValueError(f"unknown --anchor {args.anchor}, choose from {', '.join(c[0] for c in configs)}")
+
+    tasks = []
+    for tested in configs:
+        if tested is anchor:
+            continue
+        for game in range(args.games):
+            fen = OPENING_FENS[(game // 2) % len(OPENING_FENS)]
+            tasks.append((args.stockfish, tested, anchor, fen, game % 2 == 0, args.movetime))
+
+    print(f"{len(configs)} configurations, {len(tasks)} games on {args.workers} workers, anchor {anchor[0]}")
+    started = time.time()
+    scores = {name: [] for name, _ in configs}
+    times = {name: [] for name, _ in configs}
+    pool = multiprocessing.Pool(args.workers, initializer=init_worker)
+    try:
+        for done, (name, score, move_times) in enumerate(pool.imap_unordered(play_game, tasks), 1):
+            scores[name].append(score)
+            for side, values in move_times.items():
+                times[side].extend(values)
+            if done % 10 == 0 or done == len(tasks):
+                print(f"{done}/{len(tasks)} games")
+    finally:
+        pool.close()
+        pool.join()
+
+    results = []
+    for name, config in configs:
+        entry = {'name': name, 'config': config, 'latency_ms': latency_summary(times[name])}
+        if name == anchor[0]:
+            entry.update({'games': sum(len(s) for s in scores.values()), 'elo': 0.0, 'elo_low': 0.0,
+                          'elo_high': 0.0, 'elo_error': 0.0})
+        elif scores[name]:
+            elo, low, high = elo_estimate(scores[name])
+            entry.update({
+                'games': len(scores[name]),
+                'wins': scores[name].count(1.0),
+                'draws': scores[name].count(0.5),
+                'losses': scores[name].count(0.0),
+                'score': round(sum(scores[name]) / len(scores[name]), 3),
+                'elo': elo,
+                'elo_low': low,
+                'elo_high': high,
+                # Half the interval's width, None while either end is unbounded
+                'elo_error': round((high - low) / 2, 1) if low is not None and high is not None else None
+            })
+        results.append(entry)
+
+    return {
+        'anchor': anchor[0],
+        'machine': {'cores': os.cpu_count(), 'platform': platform.platform(), 'python': platform.python_version()},
+        'settings': {'games_per_config': args.games, 'movetime': args.movetime, 'workers': args.workers,
+                     'stockfish': args.stockfish},
+        'duration_s': round(time.time() - started, 1),
+        'results': sorted(results, key=lambda r: r['name'])
+    }
+
+
+def _bound(value, unbounded):
+    return unbounded if value is None else value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the strength and move time of engine configurations")
+    parser.add_argument('--elos', default='1350,1600,2000,2400', help="comma separated UCI_Elo values")
+    parser.add_argument('--skills', default='10', help="comma separated Skill Level values")
+    parser.add_argument('--nnue-dir', default=NNUE_BASE_DIR, help="every *.nnue file here is benchmarked")
+    parser.add_argument('--no-default', dest='include_default', action='store_false',
+                        help="skip Stockfish's built-in network")
+    parser.add_argument('--anchor', default=None, help="configuration name the others are measured against")
+    parser.add_argument('--games', type=int, default=20, help="games per configuration against the anchor")
+    parser.add_argument('--movetime', type=float, default=0.1, help="seconds per move")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="parallel worker processes")
+    parser.add_argument('--stockfish', default=STOCKFISH_PATH)
+    parser.add_argument('--output', default='elo_report.json')
+    args = parser.parse_args()
+
+    try:
+        report = run(args)
+    except ValueError as e:
+        parser.error(str(e))
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    for entry in report['results']:
+        latency = entry['latency_ms'] or {}
+        interval = f"[{_bound(entry.get('elo_low'), '-inf')}, {_bound(entry.get('elo_high'), '+inf')}]"
+        print(f"{entry['name']:<40} {_bound(entry.get('elo'), '?'):>8} {interval:<20} "
+              f"p50 {latency.get('p50')}ms p99 {latency.get('p99')}ms")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
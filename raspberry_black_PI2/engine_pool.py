@@ -0,0 +1,408 @@
+"""
+Stockfish Engine Pool
+Keeps a fixed number of Stockfish processes running so Flask's worker threads
+do not all queue up behind one UCI process.
+
+A request checks an engine out, the pool configures it with the options that
+request asked for (Elo, Skill Level, EvalFile, ...), and the engine goes back
+to the pool when the request is done.
+
+With a resource budget (resources.ResourceBudget) the pool also sets Threads
+and Hash on every engine, and splits them again when the pool grows or
+shrinks.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+import chess.engine
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no engine became free before the checkout timeout"""
+
+
+class PooledEngine:
+    """One Stockfish process plus the UCI options it currently has applied"""
+
+    def __init__(self, engine, slot):
+        self.engine = engine
+        self.slot = slot
+        self.applied = {}
+        self.last_used = time.time()
+
+
+class EnginePool:
+    def __init__(self, engine_path, size, base_config=None, standby=False, resources=None):
+        self.engine_path = engine_path
+        self.size = max(1, int(size))
+        self.base_config = dict(base_config or {})
+        # Keep one extra engine spawned and configured to swap in when one dies
+        self.standby_enabled = standby
+        # Splits Threads and Hash across the running engines
+        self.resources = resources
+
+        self._lock = threading.Condition()
+        self._idle = []
+        self._busy = {}
+        self._standby = None
+        self._filling_standby = False
+        self._closed = False
+
+        # Metrics
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._waiting = 0
+        self._respawns = 0
+        self._failovers = 0
+        self._failover_time = 0.0
+        self._max_failover_time = 0.0
+        self._watchdog_pings = 0
+        self._watchdog_failures = 0
+        self._eval_file_loads = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+        self._rebalance()
+
+    def _rebalance(self):
+        """Split Threads and Hash across the engines the pool has now, idle engines pick them up on checkout"""
+        if not self.resources:
+            return
+        processes = self.size + (1 if self.standby_enabled else 0)
+        options = self.resources.allocate(processes)
+        with self._lock:
+            self.base_config.update(options)
+
+    def _spawn(self, slot):
+        """Start one Stockfish process and apply the base config"""
+        engine = chess.engine.SimpleEngine.popen_uci(self.engine_path)
+        pooled = PooledEngine(engine, slot)
+        self._configure(pooled, self.base_config)
+        return pooled
+
+    def start(self):
+        """Spawn every engine in the pool, returns True if at least one started"""
+        started = 0
+        for slot in range(self.size):
+            try:
+                pooled = self._spawn(slot)
+            except Exception as e:
+                print(f"Failed to start engine {slot}: {e}")
+                continue
+            with self._lock:
+                self._idle.append(pooled)
+                self._lock.notify()
+            started += 1
+        print(f"Engine pool started with {started}/{self.size} engines")
+        if started and started < self.size:
+            # Give the engines that did start the cores and memory of the ones that did not
+            with self._lock:
+                self.size = started
+            self._rebalance()
+        if started and self.standby_enabled:
+            self._fill_standby()
+        return started > 0
+
+    def _fill_standby(self):
+        """Spawn the standby engine if there is none"""
+        with self._lock:
+            if not self.standby_enabled or self._closed or self._standby or self._filling_standby:
+                return
+            self._filling_standby = True
+        try:
+            standby = self._spawn(-1)
+        except Exception as e:
+            print(f"Failed to start standby engine: {e}")
+            standby = None
+        with self._lock:
+            self._filling_standby = False
+            if self._closed and standby:
+                standby.engine.close()
+            else:
+                self._standby = standby
+
+    def _configure(self, pooled, config):
+        """Send only the options that differ from what the engine already has"""
+        changed = {name: value for name, value in config.items()
+                   if pooled.applied.get(name) != value}
+        # Options a previous checkout set but this one does not go back to default
+        reset = {}
+        for name in pooled.applied:
+            if name not in config:
+                option = pooled.engine.options.get(name)
+                if option is not None and option.default is not None:
+                    reset[name] = option.default
+        if changed or reset:
+            pooled.engine.configure({**reset, **changed})
+            pooled.applied = dict(config)
+            if "EvalFile" in changed or "EvalFile" in reset:
+                with self._lock:
+                    self._eval_file_loads += 1
+
+    def _is_dead(self, pooled):
+        return pooled.engine.returncode.done()
+
+    def _respawn(self, pooled):
+        """Replace a dead engine in the same slot, with the standby engine when there is one"""
+        start = time.time()
+        try:
+            pooled.engine.close()
+        except Exception:
+            pass
+        with self._lock:
+            replacement, self._standby = self._standby, None
+        if replacement is not None and not self._is_dead(replacement):
+            replacement.slot = pooled.slot
+            # Spawn the next standby off the request path
+            threading.Thread(target=self._fill_standby, daemon=True).start()
+            failover_time = time.time() - start
+            with self._lock:
+                self._failovers += 1
+                self._failover_time += failover_time
+                self._max_failover_time = max(self._max_failover_time, failover_time)
+            print(f"Engine {pooled.slot} replaced by standby in {failover_time * 1000:.1f}ms")
+            return replacement
+        try:
+            replacement = self._spawn(pooled.slot)
+        except Exception as e:
+            print(f"Failed to respawn engine {pooled.slot}: {e}")
+            return None
+        with self._lock:
+            self._respawns += 1
+        print(f"Engine {pooled.slot} respawned")
+        threading.Thread(target=self._fill_standby, daemon=True).start()
+        return replacement
+
+    def start_watchdog(self, interval):
+        """Ping idle engines every interval seconds and replace any that stopped answering"""
+        threading.Thread(target=self._watchdog, args=(interval,), name="engine-watchdog", daemon=True).start()
+
+    def _watchdog(self, interval):
+        while not self._closed:
+            time.sleep(interval)
+            with self._lock:
+                idle = list(self._idle)
+            for pooled in idle:
+                with self._lock:
+                    # Skip engines a request took in the meantime
+                    if pooled not in self._idle:
+                        continue
+                    self._idle.remove(pooled)
+                    self._busy[pooled.engine] = pooled
+                last_used = pooled.last_used
+                dead = False
+                try:
+                    pooled.engine.ping()
+                except Exception as e:
+                    print(f"Watchdog: engine {pooled.slot} failed ping: {e}")
+                    dead = True
+                with self._lock:
+                    self._watchdog_pings += 1
+                    if dead:
+                        self._watchdog_failures += 1
+                self.release(pooled.engine, dead)
+                # A ping is not a use, keep the LRU order for NNUE loading
+                pooled.last_used = last_used
+            # The standby can die too
+            with self._lock:
+                standby = self._standby
+                if standby and self._is_dead(standby):
+                    self._standby = None
+            self._fill_standby()
+
+    def _pick_idle(self, config):
+        # An engine that already has this EvalFile loaded (most recently used first),
+        # otherwise the one whose network was used least recently gets reloaded
+        eval_file = config.get("EvalFile")
+        matching = [pooled for pooled in self._idle if pooled.applied.get("EvalFile") == eval_file]
+        if matching:
+            pooled = max(matching, key=lambda p: p.last_used)
+        else:
+            pooled = min(self._idle, key=lambda p: p.last_used)
+        self._idle.remove(pooled)
+        return pooled
+
+    def _acquire(self, timeout, config):
+        start = time.time()
+        with self._lock:
+            waited = False
+            self._waiting += 1
+            try:
+                while not self._idle:
+                    if self._closed or self.size == 0:
+                        raise chess.engine.EngineTerminatedError("engine pool is closed or empty")
+                    waited = True
+                    remaining = None if timeout is None else timeout - (time.time() - start)
+                    if remaining is not None and remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(f"No engine free after {timeout:.1f}s")
+                    self._lock.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            pooled = self._pick_idle(config)
+            self._busy[pooled.engine] = pooled
+
+            wait_time = time.time() - start
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+            self._total_wait += wait_time
+            self._max_wait = max(self._max_wait, wait_time)
+        return pooled
+
+    def effective_config(self, config=None):
+        """The options an engine checked out with config runs with, the pool's Threads/Hash split included"""
+        with self._lock:
+            return {**self.base_config, **(config or {})}
+
+    def _checked_out(self, pooled, config):
+        try:
+            self._configure(pooled, config)
+        except chess.engine.EngineTerminatedError:
+            self.release(pooled.engine, dead=True)
+            raise
+        except Exception:
+            self.release(pooled.engine)
+            raise
+        return pooled.engine
+
+    def acquire(self, config=None, timeout=None):
+        """Take an engine out of the pool configured with config, give it back with release()"""
+        config = self.effective_config(config)
+        return self._checked_out(self._acquire(timeout, config), config)
+
+    def try_acquire(self, config=None, spare=0):
+        """Like acquire(), but only while more than spare engines are idle and no request is waiting
+        Returns None instead of waiting, for background searches that must leave engines to requests
+        """
+        config = self.effective_config(config)
+        with self._lock:
+            if self._closed or self._waiting or len(self._idle) <= spare:
+                return None
+            pooled = self._pick_idle(config)
+            self._busy[pooled.engine] = pooled
+            self._checkouts += 1
+        return self._checked_out(pooled, config)
+
+    def release(self, engine, dead=False):
+        """Return an engine to the pool, dead engines are respawned in the same slot"""
+        with self._lock:
+            pooled = self._busy.pop(engine)
+        if dead or self._is_dead(pooled):
+            replacement = self._respawn(pooled)
+            if replacement is None:
+                # Could not respawn, shrink the pool rather than hand out a dead engine
+                with self._lock:
+                    self.size -= 1
+                    self._lock.notify_all()
+                self._rebalance()
+                return
+            pooled = replacement
+        with self._lock:
+            pooled.last_used = time.time()
+            if self._closed:
+                pooled.engine.close()
+            else:
+                self._idle.append(pooled)
+            self._lock.notify()
+
+    @contextmanager
+    def checkout(self, config=None, timeout=None):
+        """Borrow an engine configured with config for the length of the with block"""
+        engine = self.acquire(config, timeout)
+        dead = False
+        try:
+            yield engine
+        except chess.engine.EngineTerminatedError:
+            dead = True
+            raise
+        finally:
+            self.release(engine, dead)
+
+    @contextmanager
+    def try_checkout(self, config=None, spare=0):
+        """checkout() through try_acquire(), the with block gets None when no engine can be spared"""
+        engine = self.try_acquire(config, spare)
+        if engine is None:
+            yield None
+            return
+        dead = False
+        try:
+            yield engine
+        except chess.engine.EngineTerminatedError:
+            dead = True
+            raise
+        finally:
+            self.release(engine, dead)
+
+    def loaded_eval_files(self):
+        """EvalFile -> number of engines (busy or idle) that have it loaded"""
+        with self._lock:
+            engines = list(self._idle) + list(self._busy.values())
+        loaded = {}
+        for pooled in engines:
+            eval_file = pooled.applied.get("EvalFile")
+            if eval_file:
+                loaded[eval_file] = loaded.get(eval_file, 0) + 1
+        return loaded
+
+    def unload(self, eval_file):
+        """Put idle engines holding eval_file back on the default network"""
+        with self._lock:
+            holders = [p for p in self._idle if p.applied.get("EvalFile") == eval_file]
+            for pooled in holders:
+                self._idle.remove(pooled)
+                self._busy[pooled.engine] = pooled
+        for pooled in holders:
+            try:
+                self._configure(pooled, self.base_config)
+            except chess.engine.EngineTerminatedError:
+                self.release(pooled.engine, dead=True)
+                continue
+            self.release(pooled.engine)
+            # Back on the default network, first in line for the next network to load
+            pooled.last_used = 0
+        return len(holders)
+
+    def stats(self):
+        """Pool metrics for /api/status"""
+        with self._lock:
+            checkouts = self._checkouts
+            return {
+                'size': self.size,
+                'busy': len(self._busy),
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'checkouts': checkouts,
+                'waited_checkouts': self._waits,
+                'timeouts': self._timeouts,
+                'respawns': self._respawns,
+                'standby_ready': self._standby is not None,
+                'failovers': self._failovers,
+                'avg_failover_ms': round(self._failover_time / self._failovers * 1000, 2) if self._failovers else 0.0,
+                'max_failover_ms': round(self._max_failover_time * 1000, 2),
+                'watchdog_pings': self._watchdog_pings,
+                'watchdog_failures': self._watchdog_failures,
+                'eval_file_loads': self._eval_file_loads,
+                'avg_wait_ms': round(self._total_wait / checkouts * 1000, 2) if checkouts else 0.0,
+                'max_wait_ms': round(self._max_wait * 1000, 2)
+            }
+
+    def close(self):
+        """Quit every idle engine, busy ones are closed when they are returned"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            if self._standby:
+                idle.append(self._standby)
+                self._standby = None
+            self._lock.notify_all()
+        for pooled in idle:
+            try:
+                pooled.engine.quit()
+            except Exception:
+                pass
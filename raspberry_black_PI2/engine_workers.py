@@ -0,0 +1,44 @@
+"""
+Engine Workers
+Engines for the offline tools' multiprocessing pools (book_builder.py and
+elo_benchmark.py). Each worker process keeps the engines it started by name
+so the next task can reuse them, and closes them when the pool shuts down.
+Pass init_worker as the pool's initializer.
+"""
+
+import multiprocessing.util
+
+import chess.engine
+
+
+# Engines started by this worker process, by name
+_engines = {}
+
+
+def close_engines(keep=()):
+    """Quit this worker's engines except those named in keep"""
+    # One network per engine adds up fast in a Pi's memory, so tasks close the engines they no longer need
+    for name in [n for n in _engines if n not in keep]:
+        try:
+            _engines.pop(name).quit()
+        except (chess.engine.EngineError, OSError):
+            pass
+
+
+def init_worker():
+    # Pool workers skip atexit, and the engines' threads would keep them from exiting
+    multiprocessing.util.Finalize(None, close_engines, exitpriority=10)
+
+
+def worker_engine(engine_path, name, config):
+    """This worker's engine called name, started and configured on first use"""
+    if name not in _engines:
+        engine = chess.engine.SimpleEngine.popen_uci(engine_path)
+        engine.configure(config)
+        _engines[name] = engine
+    return _engines[name]
+
+
+def discard_engine(name):
+    """Forget an engine that failed, the next worker_engine call starts a new one"""
+    _engines.pop(name, None)
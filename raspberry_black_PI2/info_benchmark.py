@@ -0,0 +1,90 @@
+"""
+Info Parsing Benchmark
+Shows what the engine info profiles save on this Pi. Every warm-up position
+is searched to a fixed depth once per profile through engine.analysis, so
+Stockfish does the same work each time and only the info python-chess is
+asked to parse changes:
+
+    fast-play  score and WDL only, what engine moves ask for
+    anytime    score and PV, what anytime search and pondering ask for
+    analysis   everything (PVs, refutations, currline), what /api/analyze asks for
+
+Stockfish runs in its own process, so the CPU time this process uses during
+a search is python-chess reading and parsing the engine's output. The PV is
+what costs: python-chess plays every PV move on a board copy to check it.
+The report gives the CPU time per info line and per search for each profile.
+
+    python info_benchmark.py --depth 16 --repeat 5
+"""
+
+import argparse
+import time
+
+import chess
+import chess.engine
+
+from telemetry import percentile
+from warmup import WARMUP_FENS
+
+
+STOCKFISH_PATH = "/usr/games/stockfish"
+PROFILES = {
+    'fast-play': chess.engine.INFO_SCORE,
+    'anytime': chess.engine.INFO_SCORE | chess.engine.INFO_PV,
+    'analysis': chess.engine.INFO_ALL
+}
+
+
+def time_search(engine, board, depth, selector):
+    """CPU seconds this process spends on one fixed depth search, and the info lines it read"""
+    engine.configure({"Clear Hash": None})
+    start = time.process_time()
+    lines = 0
+    with engine.analysis(board, chess.engine.Limit(depth=depth), info=selector) as analysis:
+        for _ in analysis:
+            lines += 1
+    return time.process_time() - start, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure python-chess info parsing cost per profile")
+    parser.add_argument('--stockfish', default=STOCKFISH_PATH)
+    parser.add_argument('--depth', type=int, default=16, help="depth of every search")
+    parser.add_argument('--repeat', type=int, default=5, help="searches per position and profile, the cheapest counts")
+    args = parser.parse_args()
+
+    engine = chess.engine.SimpleEngine.popen_uci(args.stockfish)
+    try:
+        # One thread keeps a fixed depth search the same every time
+        engine.configure({"Threads": 1, "UCI_ShowWDL": True})
+        results = {name: [] for name in PROFILES}
+        total_lines = {name: 0 for name in PROFILES}
+        for fen in WARMUP_FENS:
+            board = chess.Board(fen)
+            best = {name: None for name in PROFILES}
+            # Profiles take turns so a busy moment on the Pi does not land on one of them
+            for _ in range(args.repeat):
+                for name, selector in PROFILES.items():
+                    cpu, lines = time_search(engine, board, args.depth, selector)
+                    if best[name] is None or cpu < best[name][0]:
+                        best[name] = (cpu, lines)
+            for name in PROFILES:
+                results[name].append(best[name][0])
+                total_lines[name] += best[name][1]
+            print(f"{best['analysis'][1]:>5} info lines  {fen}")
+    finally:
+        engine.quit()
+
+    for name, timings in results.items():
+        per_search = sorted(t * 1000 for t in timings)
+        print(f"{name:<10} {sum(timings) / max(total_lines[name], 1) * 1e6:8.1f} us/line  "
+              f"{sum(per_search) / len(per_search):7.2f} ms/search  p90 {percentile(per_search, 90):.2f} ms")
+
+    for name in ('fast-play', 'anytime'):
+        saved = [(a - f) * 1000 for a, f in zip(results['analysis'], results[name])]
+        print(f"{name} saves {sum(saved) / len(saved):.2f} ms of CPU per search "
+              f"({sum(results[name]) / sum(results['analysis']):.0%} of the analysis cost)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Engine Result Cache
+In-memory LRU cache of engine results so positions we have already searched
+(mostly the same openings, game after game) come back without asking
+Stockfish again.
+
+Keys are the position's Zobrist hash plus everything that changes the
+engine's answer: Elo, Skill Level, EvalFile and the search limit.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+import chess.polyglot
+
+
+# Engine options that change which move comes back
+CONFIG_KEYS = ("UCI_Elo", "Skill Level", "UCI_LimitStrength", "EvalFile")
+
+
+def position_key(board, config, *extra):
+    """Cache key for board searched with config, extra is the limit (or anything else that matters)"""
+    settings = tuple(config.get(name) for name in CONFIG_KEYS)
+    return (chess.polyglot.zobrist_hash(board), settings) + extra
+
+
+def limit_key(limit):
+    """The part of a search limit that goes into the cache key"""
+    if limit.white_clock is not None or limit.black_clock is not None:
+        # Clock games get a different budget every move, key them all the same
+        return ('clock',)
+    return (limit.time, limit.depth, limit.nodes)
+
+
+def _size_of(value):
+    # Rough size of an entry, good enough to keep the cache under its cap
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_size_of(k) + _size_of(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_size_of(v) for v in value)
+    return size
+
+
+class EngineCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Cached value for key (and mark it recently used), or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store value for key, evicting the least recently used entries over the cap"""
+        size = _size_of(key) + _size_of(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes.pop(key)
+                del self._entries[key]
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                old_key, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(old_key)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit/miss counters for /api/status"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None
+            }
@@ -0,0 +1,62 @@
+"""
+Opening Book
+Looks positions up in a Polyglot .bin book before asking the engine.
+
+python-chess memory-maps the book file, so a lookup is a binary search over
+the mapped file and nothing is read into memory up front. When a position has
+several book moves one is picked at random, weighted by the book's weights.
+"""
+
+import os
+import threading
+
+import chess.polyglot
+
+
+class OpeningBook:
+    def __init__(self, path):
+        self.path = path
+        self._reader = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.probes = 0
+        self.hits = 0
+
+    def available(self):
+        return os.path.exists(self.path)
+
+    def _open(self):
+        if self._reader is None:
+            self._reader = chess.polyglot.open_reader(self.path)
+        return self._reader
+
+    def probe(self, board):
+        """Weighted random book move for board, or None when the book has no entry"""
+        with self._lock:
+            self.probes += 1
+            try:
+                entry = self._open().weighted_choice(board)
+            except IndexError:
+                return None
+            except OSError as e:
+                print(f"Opening book unavailable ({self.path}): {e}")
+                return None
+            self.hits += 1
+            return entry.move
+
+    def close(self):
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def stats(self):
+        """Book hit counters for /api/status"""
+        with self._lock:
+            return {
+                'path': self.path,
+                'probes': self.probes,
+                'hits': self.hits,
+                'hit_rate': round(self.hits / self.probes, 3) if self.probes else None
+            }
@@ -0,0 +1,82 @@
+"""
+Engine Resource Budget
+Works out Threads and Hash for every Stockfish process from the Pi's cores
+and free memory, so the engines neither sit on one thread with the default
+hash nor starve LED_Program.py and lcd_animation.py, which run on the same
+four cores.
+
+Cores and free memory are read once at startup. Every time the number of
+engine processes changes the budget is split again; the pool applies the new
+options to each engine the next time it is checked out.
+"""
+
+import os
+import threading
+
+
+def available_memory():
+    """Bytes of memory free for new processes (MemAvailable), or None if unknown"""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class ResourceBudget:
+    def __init__(self, reserved_cores=1, reserved_memory=128 * 1024 * 1024, hash_share=0.5,
+                 min_hash_mb=16, max_hash_mb=256):
+        self.cores = os.cpu_count() or 1
+        self.memory = available_memory()
+        # Left over for the LED and LCD programs and the server itself
+        self.reserved_cores = reserved_cores
+        self.reserved_memory = reserved_memory
+        # Share of the rest that goes to engine hash tables, NNUE networks need the remainder
+        self.hash_share = hash_share
+        self.min_hash_mb = min_hash_mb
+        self.max_hash_mb = max_hash_mb
+        self._lock = threading.Lock()
+        self._processes = 0
+        self._options = {}
+
+        # Metrics
+        self.rebalances = 0
+
+    def allocate(self, processes):
+        """Threads and Hash for each of processes engines, as UCI options"""
+        processes = max(1, processes)
+        threads = max(1, (self.cores - self.reserved_cores) // processes)
+        if self.memory is None:
+            hash_mb = self.min_hash_mb
+        else:
+            engine_memory = max(0, self.memory - self.reserved_memory) * self.hash_share
+            hash_mb = int(engine_memory / processes / (1024 * 1024))
+        hash_mb = max(self.min_hash_mb, min(self.max_hash_mb, hash_mb))
+        options = {"Threads": threads, "Hash": hash_mb}
+        with self._lock:
+            if processes != self._processes:
+                self.rebalances += 1
+                print(f"Engine resources: {processes} process(es), Threads {threads}, Hash {hash_mb}MB each")
+            self._processes = processes
+            self._options = options
+        return dict(options)
+
+    def stats(self):
+        """Current allocation for /api/status"""
+        with self._lock:
+            return {
+                'cores': self.cores,
+                'reserved_cores': self.reserved_cores,
+                'memory_available_mb': self.memory // (1024 * 1024) if self.memory is not None else None,
+                'reserved_memory_mb': self.reserved_memory // (1024 * 1024),
+                'processes': self._processes,
+                'threads': self._options.get("Threads"),
+                'hash_mb': self._options.get("Hash"),
+                'rebalances': self.rebalances
+            }
@@ -0,0 +1,109 @@
+"""
+Live Search Stream
+Sends the engine's progress (depth, score, WDL, PV, ...) to the GUI as
+Server-Sent Events while it searches for its move, then the move itself as
+soon as it has been chosen.
+
+There is only ever one search: the one picking the engine's move. Every
+subscriber gets its own queue and the search pushes each update into all of
+them, so more viewers never mean more engine work. Progress updates are
+throttled to a fixed rate; the start and move events always go out.
+"""
+
+import json
+import queue
+import threading
+import time
+
+import chess.engine
+
+from analysis import format_line
+
+
+class SearchStream:
+    def __init__(self, rate=4.0, queue_size=64, keepalive=15.0):
+        # Progress updates per second
+        self.interval = 1.0 / rate
+        self.queue_size = queue_size
+        # Seconds between SSE comments that keep idle connections open
+        self.keepalive = keepalive
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._last_update = 0.0
+
+        # Metrics
+        self.searches = 0
+        self.events = 0
+        self.dropped = 0
+
+    def subscribe(self):
+        """New subscriber queue, the search pushes (event, data) pairs into it"""
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def has_subscribers(self):
+        with self._lock:
+            return bool(self._subscribers)
+
+    def publish(self, event, data, throttle=False):
+        """Send an event to every subscriber, throttled events are dropped above the rate"""
+        with self._lock:
+            now = time.monotonic()
+            if throttle and now - self._last_update < self.interval:
+                return
+            if throttle:
+                self._last_update = now
+            self.events += 1
+            for subscriber in self._subscribers:
+                try:
+                    subscriber.put_nowait((event, data))
+                except queue.Full:
+                    # A client that stopped reading does not hold up the search
+                    self.dropped += 1
+
+    def play(self, engine, board, limit, info=chess.engine.Info.ALL):
+        """Search with engine.analysis, streaming progress, and return a PlayResult like engine.play"""
+        with self._lock:
+            self.searches += 1
+            self._last_update = 0.0
+        self.publish('start', {'fen': board.fen()})
+        with engine.analysis(board, limit, info=info) as analysis:
+            for update in analysis:
+                if 'pv' in update:
+                    self.publish('info', format_line(board, update), throttle=True)
+            best = analysis.wait()
+            final_info = dict(analysis.info)
+        return chess.engine.PlayResult(best.move, best.ponder, final_info)
+
+    def stream(self):
+        """SSE messages for a new subscriber, unsubscribes when the client goes away"""
+        subscriber = self.subscribe()
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event, data = subscriber.get(timeout=self.keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        """Subscriber and event counters for /api/status"""
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'rate': round(1.0 / self.interval, 2),
+                'searches': self.searches,
+                'events': self.events,
+                'dropped': self.dropped
+            }
@@ -0,0 +1,177 @@
+"""
+Speculative Search
+Uses the time the human spends thinking. After the engine moves, a short
+MultiPV search guesses the human's most likely replies, and idle engines
+from the pool search the engine's answer to each of them in the background.
+
+If the human plays one of the predicted moves the answer is already there
+(or partly searched) and /api/engine-move returns it straight away. A move
+that was not predicted throws the whole table away and stops the searches.
+
+A speculative search runs for as long as a real answer would. So it only
+takes an engine while more than SPARE_ENGINES are idle and no request is
+waiting, and an engine held for pondering is not idle. A request that
+arrives during speculation finds a spare engine. It still waits when
+several requests come at once, because speculation is not preempted.
+"""
+
+import threading
+
+import chess
+import chess.engine
+
+from analysis import wdl_percentages
+from move_cache import position_key, limit_key
+
+
+# Idle engines speculation always leaves to real requests
+SPARE_ENGINES = 1
+
+class Speculator:
+    def __init__(self, pool, top_k=2, predict_time=0.1):
+        self.pool = pool
+        self.top_k = top_k
+        self.predict_time = predict_time
+        self._lock = threading.Lock()
+        # Bumped whenever the table is thrown away, so late searches know they are stale
+        self._generation = 0
+        # Predicted human move -> the engine's answer being searched
+        self._predictions = {}
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.answered = 0
+        self.searches = 0
+
+    def start(self, board, config, limit, clock=None):
+        """Predict the human's replies to board and search the engine's answer to each in the background
+        limit is used for the answers, unless there is a clock to budget them from
+        """
+        self.clear()
+        with self._lock:
+            generation = self._generation
+        threading.Thread(target=self._speculate, args=(generation, board.copy(), dict(config), limit, clock),
+                         daemon=True).start()
+
+    def _predict(self, board, config):
+        try:
+            with self.pool.try_checkout(config, SPARE_ENGINES) as engine:
+                if engine is None:
+                    # No engine to spare, no speculation this move
+                    return []
+                infos = engine.analyse(board, chess.engine.Limit(time=self.predict_time), multipv=self.top_k,
+                                       info=chess.engine.INFO_PV)
+        except Exception:
+            # The engine died or the pool closed
+            return []
+        return [info['pv'][0] for info in infos if info.get('pv')]
+
+    def _speculate(self, generation, board, config, limit, clock):
+        moves = self._predict(board, config)
+        with self._lock:
+            if generation != self._generation:
+                return
+            entries = {move: {'done': threading.Event(), 'key': None, 'result': None, 'analysis': None}
+                       for move in moves}
+            self._predictions = dict(entries)
+        for move, entry in entries.items():
+            threading.Thread(target=self._search, args=(board, move, entry, config, limit, clock),
+                             daemon=True).start()
+
+    def _is_current(self, move, entry):
+        return self._predictions.get(move) is entry
+
+    def _search(self, board, move, entry, config, limit, clock):
+        position = board.copy()
+        position.push(move)
+        try:
+            if position.is_game_over():
+                return
+            reply_limit = clock.limit(position) if clock else limit
+            entry['key'] = position_key(position, config, *limit_key(reply_limit))
+            with self.pool.try_checkout(config, SPARE_ENGINES) as engine:
+                if engine is None:
+                    print(f"Speculative search for {move} skipped: no engine to spare")
+                    return
+                analysis = engine.analysis(position, reply_limit, info=chess.engine.INFO_SCORE)
+                with self._lock:
+                    entry['analysis'] = analysis
+                    stale = not self._is_current(move, entry)
+                    self.searches += 1
+                if stale:
+                    analysis.stop()
+                with analysis:
+                    best = analysis.wait()
+                    info = dict(analysis.info)
+            if best.move and not stale:
+                entry['result'] = {'move': best.move, 'wdl': wdl_percentages(info['wdl']) if 'wdl' in info else None}
+        except Exception as e:
+            print(f"Speculative search for {move} skipped: {e}")
+        finally:
+            entry['done'].set()
+
+    def _discard(self, entries):
+        for entry in entries:
+            if entry['analysis'] is not None and not entry['done'].is_set():
+                try:
+                    entry['analysis'].stop()
+                except Exception:
+                    pass
+
+    def human_moved(self, move):
+        """Called with the human's move: keep the matching search, stop and drop the rest"""
+        with self._lock:
+            entry = self._predictions.pop(move, None)
+            discard = list(self._predictions.values())
+            if entry is not None:
+                self.hits += 1
+                self._predictions = {move: entry}
+            else:
+                if self._predictions:
+                    self.misses += 1
+                self._predictions = {}
+                self._generation += 1
+        self._discard(discard)
+
+    def take(self, board, config, limit):
+        """The engine's speculated answer for board as {'move', 'wdl'}, or None
+        Waits for a matching search that is still running, it started before a new one could
+        """
+        if not board.move_stack:
+            return None
+        with self._lock:
+            entry = self._predictions.get(board.peek())
+        if entry is None:
+            return None
+        entry['done'].wait((limit.time or 5.0) + 1.0)
+        with self._lock:
+            self._predictions = {}
+        key = position_key(board, config, *limit_key(limit))
+        if entry['result'] is None or entry['key'] != key:
+            return None
+        with self._lock:
+            self.answered += 1
+        return entry['result']
+
+    def clear(self):
+        """Stop every speculative search and empty the table"""
+        with self._lock:
+            discard = list(self._predictions.values())
+            self._predictions = {}
+            self._generation += 1
+        self._discard(discard)
+
+    def stats(self):
+        """Prediction hit rate for /api/status"""
+        with self._lock:
+            guesses = self.hits + self.misses
+            return {
+                'top_k': self.top_k,
+                'predictions': [move.uci() for move in self._predictions],
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / guesses, 3) if guesses else None,
+                'answered': self.answered,
+                'searches': self.searches
+            }
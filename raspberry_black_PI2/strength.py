@@ -0,0 +1,82 @@
+"""
+MultiPV Sampling Strength
+Another way to play below full strength. UCI_LimitStrength / Skill Level
+make Stockfish search at full cost and then throw most of that work away.
+Here one MultiPV search at full strength scores the best few moves, and the
+move is drawn from a softmax over those scores. The temperature comes from
+the target Elo: high at 1350, so second and third best moves (and the
+occasional real mistake) come up often, close to zero at 2850.
+
+Costs one search per move, and the mistakes look like a person's: a
+slightly worse plausible move, not a random one.
+"""
+
+import math
+import random
+import threading
+
+import chess.engine
+
+
+MIN_ELO = 1350
+MAX_ELO = 2850
+# Temperature in centipawns at MIN_ELO and MAX_ELO, geometric in between
+MAX_TEMPERATURE = 150.0
+MIN_TEMPERATURE = 5.0
+MATE_SCORE = 10000
+
+
+def temperature_for_elo(elo):
+    """Softmax temperature in centipawns for a target Elo"""
+    level = (max(MIN_ELO, min(MAX_ELO, elo)) - MIN_ELO) / (MAX_ELO - MIN_ELO)
+    return MAX_TEMPERATURE * (MIN_TEMPERATURE / MAX_TEMPERATURE) ** level
+
+
+def move_probabilities(infos, temperature):
+    """(move, probability, info) for each line with a move, from the side to move's scores"""
+    lines = [info for info in infos if info.get('pv') and 'score' in info]
+    if not lines:
+        return []
+    scores = [info['score'].relative.score(mate_score=MATE_SCORE) for info in lines]
+    best = max(scores)
+    weights = [math.exp((score - best) / temperature) for score in scores]
+    total = sum(weights)
+    return [(info['pv'][0], weight / total, info) for info, weight in zip(lines, weights)]
+
+
+class SamplingStrength:
+    def __init__(self, multipv=5, seed=None):
+        self.multipv = multipv
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.moves = 0
+        self.best_moves = 0
+
+    def play(self, engine, board, limit, elo, info=chess.engine.INFO_SCORE | chess.engine.INFO_PV):
+        """One MultiPV search, then a move sampled for elo, returned as a PlayResult"""
+        infos = engine.analyse(board, limit, multipv=self.multipv, info=info)
+        choices = move_probabilities(infos, temperature_for_elo(elo))
+        if not choices:
+            # Nothing scored (mate on the board or an empty search), fall back to a plain move
+            return engine.play(board, limit, info=info)
+        with self._lock:
+            pick = self._random.random()
+            for move, probability, line in choices:
+                pick -= probability
+                if pick <= 0:
+                    break
+            self.moves += 1
+            if line is choices[0][2]:
+                self.best_moves += 1
+        return chess.engine.PlayResult(move, line['pv'][1] if len(line['pv']) > 1 else None, line)
+
+    def stats(self):
+        """How often the sampled move was the engine's best, for /api/status"""
+        with self._lock:
+            return {
+                'multipv': self.multipv,
+                'moves': self.moves,
+                'best_move_rate': round(self.best_moves / self.moves, 3) if self.moves else None
+            }
@@ -0,0 +1,100 @@
+"""
+Syzygy Endgame Tablebases
+Probes local Syzygy WDL/DTZ tables with chess.syzygy when few enough pieces
+are left, so endgames get a perfect move without running the engine.
+
+The tablebase object is opened once and kept for the life of the server;
+python-chess keeps the table files it has opened (up to max_fds) between
+probes.
+"""
+
+import os
+import threading
+
+import chess
+import chess.syzygy
+
+
+class EndgameTablebase:
+    def __init__(self, path):
+        self.path = path
+        self._tablebase = None
+        self.max_pieces = 0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.probes = 0
+        self.hits = 0
+
+    def open(self):
+        """Open every table in the directory, returns False if there are none"""
+        if not os.path.isdir(self.path):
+            return False
+        self._tablebase = chess.syzygy.open_tablebase(self.path)
+        # Table names look like KRPvKR, one letter per piece plus the "v"
+        self.max_pieces = max((len(name) - 1 for name in self._tablebase.wdl), default=0)
+        print(f"Syzygy tables loaded from {self.path} (up to {self.max_pieces} pieces)")
+        return self.max_pieces > 0
+
+    def covers(self, board):
+        """True when board has few enough pieces to be in the installed tables"""
+        return (self._tablebase is not None
+                and chess.popcount(board.occupied) <= self.max_pieces
+                and not board.castling_rights)
+
+    def _move_key(self, board, move):
+        # Higher is better for the side to move: wdl first, then quickest win or slowest loss
+        zeroing = board.is_zeroing(move)
+        board.push(move)
+        try:
+            if board.is_checkmate():
+                return (3, 0, 0)
+            opponent_wdl = self._tablebase.get_wdl(board)
+            if opponent_wdl is None:
+                return None
+            wdl = -opponent_wdl
+            dtz = self._tablebase.get_dtz(board)
+            distance = abs(dtz) if dtz is not None else 0
+            if wdl > 0:
+                # Zeroing wins reset the 50 move counter, otherwise fewest plies to the next zeroing move
+                return (wdl, zeroing, -distance)
+            if wdl < 0:
+                return (wdl, not zeroing, distance)
+            return (0, 0, 0)
+        finally:
+            board.pop()
+
+    def probe(self, board):
+        """Best move and side-to-move WDL (-2..2) for board, or None if it is not in the tables"""
+        if not self.covers(board):
+            return None
+        with self._lock:
+            self.probes += 1
+            best_move, best_key = None, None
+            position = board.copy(stack=False)
+            for move in position.legal_moves:
+                key = self._move_key(position, move)
+                if key is None:
+                    return None
+                if best_key is None or key > best_key:
+                    best_move, best_key = move, key
+            if best_move is None:
+                return None
+            self.hits += 1
+            return best_move, min(best_key[0], 2)
+
+    def close(self):
+        with self._lock:
+            if self._tablebase is not None:
+                self._tablebase.close()
+                self._tablebase = None
+
+    def stats(self):
+        """Tablebase hit counters for /api/status"""
+        with self._lock:
+            return {
+                'path': self.path,
+                'max_pieces': self.max_pieces,
+                'probes': self.probes,
+                'hits': self.hits
+            }
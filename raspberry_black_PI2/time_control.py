@@ -0,0 +1,98 @@
+"""
+Time Control
+Chess clock with a base time plus increment for both sides, and the search
+budget the engine gets from it.
+
+The engine is sent both clocks and the increment (wtime/btime/winc/binc) so
+Stockfish can manage its own time, plus a hard movetime cap worked out here
+from the remaining clock, the move number and how complicated the position
+looks. Forced replies and recaptures get a small slice, sharp middlegame
+positions get more.
+"""
+
+import time
+
+import chess
+import chess.engine
+
+
+# Moves we plan for when the time control has no moves-to-go
+MIN_MOVES_TO_GO = 20
+MAX_MOVES_TO_GO = 45
+# Never plan to use more than this share of the remaining clock on one move
+MAX_CLOCK_SHARE = 0.25
+MIN_BUDGET = 0.05
+
+
+def position_complexity(board):
+    """Rough multiplier for how much time board deserves (about 0.3 to 1.6)"""
+    legal_moves = list(board.legal_moves)
+    if len(legal_moves) <= 2:
+        return 0.3
+    if board.is_check():
+        return 0.6
+    if board.move_stack:
+        # Recapturing on the square the opponent just took on is usually obvious
+        previous = board.copy(stack=1)
+        last = previous.pop()
+        if previous.is_capture(last) and any(
+                move.to_square == last.to_square and board.is_capture(move) for move in legal_moves):
+            return 0.6
+    # Early opening moves are well known, busy middlegames need the most time
+    if board.fullmove_number <= 8:
+        return 0.7
+    return min(1.6, 0.6 + len(legal_moves) / 40)
+
+
+class GameClock:
+    def __init__(self, base, increment=0.0):
+        self.base = base
+        self.increment = increment
+        self.remaining_time = {chess.WHITE: base, chess.BLACK: base}
+        self.running = None
+        self.started_at = None
+
+    def remaining(self, color):
+        """Seconds left for color, counting the move in progress"""
+        remaining = self.remaining_time[color]
+        if self.running == color:
+            remaining -= time.monotonic() - self.started_at
+        return max(0.0, remaining)
+
+    def press(self, color):
+        """color finished its move: stop its clock, add the increment, start the opponent's"""
+        if self.running == color:
+            self.remaining_time[color] -= time.monotonic() - self.started_at
+        self.remaining_time[color] += self.increment
+        self.running = not color
+        self.started_at = time.monotonic()
+
+    def budget(self, board):
+        """Hard cap in seconds for the side to move's next search"""
+        remaining = self.remaining(board.turn)
+        moves_to_go = max(MIN_MOVES_TO_GO, MAX_MOVES_TO_GO - board.fullmove_number)
+        base_budget = remaining / moves_to_go + 0.75 * self.increment
+        budget = base_budget * position_complexity(board)
+        return max(MIN_BUDGET, min(budget, remaining * MAX_CLOCK_SHARE))
+
+    def limit(self, board):
+        """Engine limit with both clocks, the increment and the budget as movetime"""
+        return chess.engine.Limit(
+            time=self.budget(board),
+            white_clock=self.remaining(chess.WHITE),
+            black_clock=self.remaining(chess.BLACK),
+            white_inc=self.increment,
+            black_inc=self.increment
+        )
+
+    def state(self):
+        """Clock state for the move responses"""
+        white = self.remaining(chess.WHITE)
+        black = self.remaining(chess.BLACK)
+        return {
+            'white': round(white, 1),
+            'black': round(black, 1),
+            'increment': self.increment,
+            'running': None if self.running is None else ('white' if self.running else 'black'),
+            'flagged': 'white' if white <= 0 else 'black' if black <= 0 else None
+        }
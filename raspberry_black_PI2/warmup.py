@@ -0,0 +1,93 @@
+"""
+Engine Warm-up
+Runs isready and a few short searches on every engine before the server
+says it is ready, so the first real move does not pay for hash allocation,
+loading the NNUE network and cold CPU caches.
+
+Also runs again (on one engine) after the engine settings change.
+"""
+
+import threading
+import time
+
+import chess
+import chess.engine
+
+
+# Opening, quiet and sharp middlegames and an endgame
+WARMUP_FENS = [
+    chess.STARTING_FEN,
+    "r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+    "r2q1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP2BPPP/R2Q1RK1 w - - 0 10",
+    "r1b2rk1/2q1bppp/p2ppn2/1p6/3BPP2/2N2B2/PPPQ2PP/2KR3R w - - 0 14",
+    "8/5pk1/6p1/8/3R4/6P1/5PKP/r7 w - - 0 40"
+]
+
+
+class EngineWarmup:
+    def __init__(self, pool, search_time=0.05, timeout=30.0):
+        self.pool = pool
+        self.search_time = search_time
+        self.timeout = timeout
+        # Set once warm-up is finished, cleared while it runs
+        self.ready = threading.Event()
+
+        # Metrics
+        self.runs = 0
+        self.duration = None
+        self.cold_search = None
+        self.warm_search = None
+        self.first_move = None
+
+    def _search(self, engine, fen):
+        start = time.time()
+        engine.play(chess.Board(fen), chess.engine.Limit(time=self.search_time))
+        return time.time() - start
+
+    def run(self, config, engines=None):
+        """Warm up engines (all of them by default) with config, then mark the server ready"""
+        self.ready.clear()
+        start = time.time()
+        count = self.pool.size if engines is None else min(engines, self.pool.size)
+        held = []
+        try:
+            for _ in range(count):
+                # Hold each engine so the next acquire hands out a different one
+                engine = self.pool.acquire(config, timeout=self.timeout)
+                held.append(engine)
+                engine.ping()
+                for fen in WARMUP_FENS:
+                    elapsed = self._search(engine, fen)
+                    if len(held) == 1 and fen == WARMUP_FENS[0]:
+                        self.cold_search = elapsed
+            if held:
+                # The first position again now that caches and the network are warm
+                self.warm_search = self._search(held[0], WARMUP_FENS[0])
+        except Exception as e:
+            print(f"Engine warm-up failed: {e}")
+        finally:
+            for engine in held:
+                self.pool.release(engine)
+            self.runs += 1
+            self.duration = time.time() - start
+            self.first_move = None
+            self.ready.set()
+        print(f"Engine warm-up finished in {self.duration:.2f}s on {len(held)} engine(s)")
+
+    def record_move(self, seconds):
+        """Remember how long the first engine move after a warm-up took"""
+        if self.first_move is None:
+            self.first_move = seconds
+
+    def stats(self):
+        """Warm-up timings for /api/status"""
+        def ms(seconds):
+            return round(seconds * 1000, 1) if seconds is not None else None
+        return {
+            'ready': self.ready.is_set(),
+            'runs': self.runs,
+            'duration_ms': ms(self.duration),
+            'cold_search_ms': ms(self.cold_search),
+            'warm_search_ms': ms(self.warm_search),
+            'first_move_ms': ms(self.first_move)
+        }
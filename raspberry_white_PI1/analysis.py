@@ -0,0 +1,58 @@
+"""
+Engine Analysis
+Turns the info dicts python-chess returns from engine.analyse() and
+engine.analysis() into what the GUI shows: ranked lines with score, WDL,
+depth and the principal variation in SAN.
+
+Scores and WDL are always from white's side, the same as the WDL sent with
+engine moves.
+"""
+
+
+def wdl_percentages(pov_wdl):
+    """Convert an engine PovWdl into win/draw/loss percentages from white's side"""
+    wdl = pov_wdl.white()
+    total = wdl.wins + wdl.draws + wdl.losses
+    if total <= 0:
+        return None
+    return {
+        'win': round((wdl.wins / total) * 100, 1),
+        'draw': round((wdl.draws / total) * 100, 1),
+        'loss': round((wdl.losses / total) * 100, 1)
+    }
+
+
+def score_json(pov_score):
+    """Centipawns or moves to mate from white's side"""
+    score = pov_score.white()
+    if score.is_mate():
+        return {'cp': None, 'mate': score.mate()}
+    return {'cp': score.score(), 'mate': None}
+
+
+def pv_san(board, pv):
+    """Principal variation in SAN, cut at the first move that is not legal"""
+    position = board.copy(stack=False)
+    san = []
+    for move in pv:
+        if move not in position.legal_moves:
+            break
+        san.append(position.san(move))
+        position.push(move)
+    return san
+
+
+def format_line(board, info):
+    """One analysis line for the GUI from an engine info dict"""
+    pv = info.get('pv') or []
+    return {
+        'rank': info.get('multipv', 1),
+        'move': pv[0].uci() if pv else None,
+        'san': board.san(pv[0]) if pv and pv[0] in board.legal_moves else None,
+        'score': score_json(info['score']) if 'score' in info else None,
+        'wdl': wdl_percentages(info['wdl']) if 'wdl' in info else None,
+        'depth': info.get('depth'),
+        'seldepth': info.get('seldepth'),
+        'nodes': info.get('nodes'),
+        'pv': pv_san(board, pv)
+    }
@@ -0,0 +1,117 @@
+"""
+Anytime Search
+Stops a move search early once it has made up its mind. With a fixed time
+or node limit Stockfish uses the whole budget even when the best move has
+not changed since depth 8. Here the search runs with engine.analysis and
+watches the main line depth by depth: once the best move has stayed the
+same, and the score within a small margin, for enough depths in a row the
+search is stopped and that move is played.
+
+The limit the search was given still applies, and a hard time cap stops a
+search whose engine has gone quiet. Positions where the best move keeps
+changing use their whole budget, so only stable positions answer sooner.
+
+follow() also takes over a search that is already running, like a ponder
+search on the position the human has just reached. The depths searched
+before the hit count towards stability, the time limit only counts from it.
+"""
+
+import threading
+import time
+
+import chess.engine
+
+
+MATE_SCORE = 100000
+
+
+class AnytimeSearch:
+    def __init__(self, stable_depths=4, min_depth=8, score_margin=20, max_time=10.0):
+        self.stable_depths = stable_depths
+        self.min_depth = min_depth
+        self.score_margin = score_margin
+        self.max_time = max_time
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.searches = 0
+        self.early_stops = 0
+        self.capped = 0
+        self.time_saved = 0.0
+
+    def _is_stable(self, history):
+        # history holds (depth, move, score) for each finished depth, newest last
+        if len(history) < self.stable_depths or history[-1][0] < self.min_depth:
+            return False
+        recent = history[-self.stable_depths:]
+        move = recent[-1][1]
+        scores = [score for _, _, score in recent]
+        return all(m == move for _, m, _ in recent) and max(scores) - min(scores) <= self.score_margin
+
+    def play(self, engine, board, limit, info=chess.engine.INFO_SCORE | chess.engine.INFO_PV):
+        """Search board under limit, stopping once the best move is stable, returns a PlayResult"""
+        # The main line is what gets watched, so PVs are always parsed
+        info |= chess.engine.INFO_SCORE | chess.engine.INFO_PV
+        return self.follow(engine.analysis(board, limit, info=info), limit)
+
+    def follow(self, analysis, limit, start=None):
+        """Watch a running engine.analysis (with PVs) until its best move is stable or limit runs out
+        from start (now by default), returns a PlayResult. The engine does not have to know the limit
+        """
+        start = start or time.time()
+        stopped_early = False
+        with analysis:
+            # Also what stops a search whose engine stops talking, or that was started without the limit
+            timer = threading.Timer(min(self.max_time, limit.time or self.max_time), analysis.stop)
+            timer.daemon = True
+            timer.start()
+            try:
+                history = []
+                for update in analysis:
+                    if ((limit.nodes and update.get('nodes', 0) >= limit.nodes)
+                            or (limit.depth and update.get('depth', 0) >= limit.depth and 'pv' in update)):
+                        analysis.stop()
+                        break
+                    # Only whole iterations count: skip currmove lines, other MultiPV lines and bounds
+                    if ('pv' not in update or 'score' not in update or update.get('multipv', 1) != 1
+                            or update.get('lowerbound') or update.get('upperbound')):
+                        continue
+                    entry = (update.get('depth', 0), update['pv'][0],
+                             update['score'].relative.score(mate_score=MATE_SCORE))
+                    if history and history[-1][0] == entry[0]:
+                        # Stockfish can send the same depth again after a re-search
+                        history[-1] = entry
+                    else:
+                        history.append(entry)
+                    if self._is_stable(history):
+                        stopped_early = True
+                        analysis.stop()
+                        break
+                best = analysis.wait()
+            finally:
+                timer.cancel()
+            final_info = dict(analysis.info)
+        elapsed = time.time() - start
+
+        with self._lock:
+            self.searches += 1
+            if stopped_early:
+                self.early_stops += 1
+                if limit.time:
+                    self.time_saved += max(0.0, limit.time - elapsed)
+            elif elapsed >= self.max_time:
+                self.capped += 1
+        return chess.engine.PlayResult(best.move, best.ponder, final_info)
+
+    def stats(self):
+        """Early stop counters for /api/status"""
+        with self._lock:
+            return {
+                'stable_depths': self.stable_depths,
+                'min_depth': self.min_depth,
+                'searches': self.searches,
+                'early_stops': self.early_stops,
+                'early_stop_rate': round(self.early_stops / self.searches, 3) if self.searches else None,
+                'capped': self.capped,
+                'time_saved_s': round(self.time_saved, 2)
+            }
@@ -0,0 +1,30 @@
+"""
+NNUE Models
+The personality networks and where their files live, shared by the server,
+book_builder.py and elo_benchmark.py so a new personality is added once.
+"""
+
+import os
+
+
+NNUE_BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'nnue'))
+# Network file of each personality, under NNUE_BASE_DIR
+NNUE_FILES = {
+    'carlsen': 'carlsen_halfkav2_hm.nnue',
+    'fischer': 'fischer_01.nnue',
+    'yifan': 'yifan.nnue',
+    'spassky': 'spassky.nnue',
+    'nakamura': 'nakamura.nnue',
+    'krush': 'krush.nnue',
+    'polgar': 'polgar.nnue',
+    'anand': 'anand.nnue'
+}
+
+
+def nnue_path(model, nnue_dir=NNUE_BASE_DIR):
+    """Path of model's network file in nnue_dir"""
+    return os.path.join(nnue_dir, NNUE_FILES.get(model, f'{model}.nnue'))
+
+
+# Absolute path of every personality's network
+NNUE_MODELS = {model: nnue_path(model) for model in NNUE_FILES}
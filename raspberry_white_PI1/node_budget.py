@@ -0,0 +1,82 @@
+"""
+Node Budgets
+Limits engine searches by node count instead of time. A time limit gives a
+weaker move whenever the LED and LCD animations happen to be busy, a node
+limit gives the same search every time and only the latency moves.
+
+The node budget for a move is the think time the game speed asks for times
+the nodes per second this Pi manages, measured once by calibrate() and saved
+next to the server. The server calibrates again when the engines get a
+different Threads setting (a rebalance), or when the saved file is deleted.
+"""
+
+import json
+import time
+
+import chess
+import chess.engine
+
+from warmup import WARMUP_FENS
+
+
+class NodeBudget:
+    def __init__(self, path, min_nodes=2000):
+        self.path = path
+        self.min_nodes = min_nodes
+        self.nps = None
+        self.threads = None
+        self.calibrated_at = None
+        self.load()
+
+    def load(self):
+        """Read a saved calibration, returns False if there is none"""
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            self.nps = int(saved['nps'])
+            self.threads = saved.get('threads')
+            self.calibrated_at = saved.get('calibrated_at')
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        return True
+
+    def calibrated_for(self, threads):
+        """True when there is a calibration measured with this many engine threads"""
+        return self.nps is not None and self.threads == threads
+
+    def calibrate(self, pool, config, search_time=0.5, timeout=30.0):
+        """Measure nodes per second on one engine over the warm-up positions and save it"""
+        nodes, elapsed = 0, 0.0
+        threads = pool.effective_config().get("Threads", 1)
+        with pool.checkout(config, timeout=timeout) as engine:
+            for fen in WARMUP_FENS:
+                start = time.time()
+                info = engine.analyse(chess.Board(fen), chess.engine.Limit(time=search_time),
+                                      info=chess.engine.INFO_BASIC)
+                nodes += info.get('nodes', 0)
+                elapsed += info.get('time') or (time.time() - start)
+        if not nodes or elapsed <= 0:
+            raise RuntimeError("engine reported no nodes during calibration")
+        self.nps = int(nodes / elapsed)
+        self.threads = threads
+        self.calibrated_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            with open(self.path, "w") as f:
+                json.dump({'nps': self.nps, 'threads': self.threads, 'calibrated_at': self.calibrated_at}, f)
+        except OSError as e:
+            print(f"Could not save node calibration to {self.path}: {e}")
+        print(f"Node calibration: {self.nps} nodes/s with {self.threads} thread(s)")
+        return self.nps
+
+    def nodes(self, think_time):
+        """Node budget worth think_time seconds of search on this Pi"""
+        return max(self.min_nodes, int(self.nps * think_time))
+
+    def stats(self):
+        """Calibration for /api/status"""
+        return {
+            'nps': self.nps,
+            'threads': self.threads,
+            'calibrated_at': self.calibrated_at,
+            'min_nodes': self.min_nodes
+        }
@@ -0,0 +1,92 @@
+"""
+NNUE Personality Engines
+Keeps engines in the pool preloaded with the NNUE files of the personalities
+(carlsen, fischer, polgar, ...) that were played most recently, so switching
+personality does not make the next move wait for Stockfish to load a network.
+
+Switching only swaps the config the server hands to the pool; searches that
+are already running keep the engine and network they checked out. The new
+network is loaded into an idle engine off the request path (the server calls
+switch() from a background thread), and the pool sends each engine only the
+UCI options that differ from what it already has.
+"""
+
+import os
+import threading
+import time
+
+
+class PersonalityEngines:
+    def __init__(self, pool, warm_engines, memory_budget):
+        self.pool = pool
+        # How many engines may hold a personality network, and how much memory those may use
+        self.warm_engines = max(1, min(warm_engines, pool.size))
+        self.memory_budget = memory_budget
+        self._last_used = {}
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.switches = 0
+        self.preloads = 0
+        self.evictions = 0
+
+    def _size(self, eval_file):
+        try:
+            return os.path.getsize(eval_file)
+        except OSError:
+            return 0
+
+    def _evict_for(self, eval_file):
+        # Drop least recently used networks until eval_file fits in the engine and memory budget
+        loaded = self.pool.loaded_eval_files()
+        loaded.pop(eval_file, None)
+        while loaded and (len(loaded) + 1 > self.warm_engines or
+                          sum(self._size(f) for f in loaded) + self._size(eval_file) > self.memory_budget):
+            oldest = min(loaded, key=lambda f: self._last_used.get(f, 0))
+            del loaded[oldest]
+            if self.pool.unload(oldest):
+                self.evictions += 1
+                print(f"Unloaded NNUE file {os.path.basename(oldest)}")
+
+    def _warm(self, config):
+        eval_file = config.get("EvalFile")
+        with self._lock:
+            if not eval_file or eval_file in self.pool.loaded_eval_files():
+                return
+            self._evict_for(eval_file)
+            try:
+                # The pool hands out the engine whose network was used least recently
+                with self.pool.checkout(config, timeout=10.0):
+                    pass
+            except Exception as e:
+                print(f"Could not preload NNUE file {eval_file}: {e}")
+                return
+            self.preloads += 1
+            print(f"Preloaded NNUE file {os.path.basename(eval_file)}")
+
+    def preload(self, configs):
+        """Load a list of personality configs before the server starts taking requests"""
+        for config in configs:
+            self._last_used[config.get("EvalFile")] = time.time()
+            self._warm(config)
+
+    def switch(self, config):
+        """Record config as the active personality and load its network into an idle engine"""
+        self.switches += 1
+        eval_file = config.get("EvalFile")
+        if eval_file:
+            self._last_used[eval_file] = time.time()
+            self._warm(config)
+
+    def stats(self):
+        """Loaded networks and switch counters for /api/status"""
+        loaded = self.pool.loaded_eval_files()
+        return {
+            'loaded': {os.path.basename(f): count for f, count in loaded.items()},
+            'loaded_bytes': sum(self._size(f) for f in loaded),
+            'memory_budget': self.memory_budget,
+            'warm_engines': self.warm_engines,
+            'switches': self.switches,
+            'preloads': self.preloads,
+            'evictions': self.evictions
+        }
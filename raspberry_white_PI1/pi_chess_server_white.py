@@ -9,31 +9,196 @@ The GUI coordinates all moves - this Pi just maintains board state and calculate
 # Import Libraries
 import chess
 import chess.engine
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import json
 import time
 import os
 import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from engine_pool import EnginePool
+from ponder import Ponderer
+from move_cache import EngineCache, position_key, limit_key
+from opening_book import OpeningBook
+from tablebase import EndgameTablebase
+from personalities import PersonalityEngines
+from time_control import GameClock
+from warmup import EngineWarmup
+from resources import ResourceBudget
+from analysis import wdl_percentages, score_json, format_line
+from search_stream import SearchStream
+from speculation import Speculator
+from node_budget import NodeBudget
+from telemetry import SearchTelemetry
+from beginner import BeginnerEngine, MIN_ELO as BEGINNER_MIN_ELO
+from strength import SamplingStrength
+from anytime import AnytimeSearch
+from triage import MoveTriage
+from nnue_models import NNUE_MODELS
 
 # Call Flask
 app = Flask(__name__)
 
 # Global game state
 board = chess.Board()
-engine = None
+engine_pool = None
+ponderer = None
+speculator = None
+personalities = None
+game_clock = None
+engine_warmup = None
 game_active = False
 current_player = "white"
 
-# NNUE file paths (absolute paths)
-NNUE_BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'nnue'))
-CARLSEN_NNUE_PATH = os.path.join(NNUE_BASE_DIR, 'carlsen_halfkav2_hm.nnue')
-FISCHER_NNUE_PATH = os.path.join(NNUE_BASE_DIR, 'fischer_01.nnue')
-YIFAN_NNUE_PATH = os.path.join(NNUE_BASE_DIR, 'yifan.nnue')
-SPASSKY_NNUE_PATH = os.path.join(NNUE_BASE_DIR, 'spassky.nnue')
-NAKAMURA_NNUE_PATH = os.path.join(NNUE_BASE_DIR, 'nakamura.nnue')
-KRUSH_NNUE_PATH = os.path.join(NNUE_BASE_DIR, 'krush.nnue')
-POLGAR_NNUE_PATH = os.path.join(NNUE_BASE_DIR, 'polgar.nnue')
-ANAND_NNUE_PATH = os.path.join(NNUE_BASE_DIR, 'anand.nnue')
+# Stockfish settings
+STOCKFISH_PATH = "/usr/games/stockfish"
+# Cores and memory left for the LED and LCD programs
+ENGINE_RESERVED_CORES = 1
+ENGINE_RESERVED_MEMORY = 128 * 1024 * 1024
+# One engine per core, leaving the reserved cores free for the LED and LCD programs
+ENGINE_POOL_SIZE = max(1, (os.cpu_count() or 2) - ENGINE_RESERVED_CORES)
+# How long a request waits for a free engine before giving up (seconds)
+ENGINE_CHECKOUT_TIMEOUT = 30.0
+# Keep a spare engine running to swap in when one dies, and ping idle engines in the background
+ENGINE_STANDBY = True
+ENGINE_WATCHDOG_INTERVAL = 5.0
+# Short searches run on every engine at startup and after settings change
+ENGINE_WARMUP_ENABLED = True
+ENGINE_WARMUP_SEARCH_TIME = 0.05
+# How long a move request waits for a warm-up in progress (seconds)
+ENGINE_WARMUP_TIMEOUT = 15.0
+# Keep an engine thinking on the human's time (needs at least two engines in the pool)
+PONDER_ENABLED = True
+# Search answers to the human's likely replies while they think (needs at least two engines)
+SPECULATION_ENABLED = True
+SPECULATION_TOP_K = 2
+SPECULATION_PREDICT_TIME = 0.1
+# Search by think time ('time') or node count ('nodes') when there is no clock. Nodes give
+# the same strength whatever the LEDs and LCD are doing, but the engines have to be calibrated
+# first (a few seconds), so they are opt-in here or per game through set-bot-difficulty
+SEARCH_MODE = 'time'
+NODE_CALIBRATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'node_calibration.json')
+# Positions with nothing to think about (one legal move, mate in one) are answered without
+# the engine, optionally taking back a piece the human just traded off as well
+TRIAGE_ENABLED = True
+TRIAGE_RECAPTURE = True
+# Smallest piece whose capture is answered with an obvious recapture (centipawns)
+TRIAGE_RECAPTURE_MIN_VALUE = 300
+# Below Stockfish's Elo floor (1350) an in-process engine plays instead
+BEGINNER_ENABLED = True
+# Search budget for one beginner move (nodes, seconds), it plays from the deepest search that fits
+BEGINNER_MAX_NODES = 3000
+BEGINNER_MAX_TIME = 0.03
+# How Stockfish plays below full strength: 'uci' (UCI_LimitStrength / Skill Level) or
+# 'sampling' (one full-strength MultiPV search, move drawn with an Elo-based temperature)
+STRENGTH_MODEL = 'uci'
+STRENGTH_SAMPLING_MULTIPV = 5
+# Stop a move search once the best move has held for ANYTIME_STABLE_DEPTHS depths (from
+# ANYTIME_MIN_DEPTH on) with the score within ANYTIME_SCORE_MARGIN centipawns. With pondering
+# on, a ponder hit takes over the ponder search, whose depths count towards the stable ones.
+# Off by default: it has to watch the main line, so engine moves parse whole PVs instead of
+# FAST_PLAY_INFO's score only, about three times the python-chess CPU per move
+ANYTIME_ENABLED = False
+ANYTIME_STABLE_DEPTHS = 4
+ANYTIME_MIN_DEPTH = 8
+ANYTIME_SCORE_MARGIN = 20
+# Hard cap on one search however its limit looks (seconds)
+ANYTIME_MAX_TIME = 30.0
+# Engine move searches kept for /api/telemetry
+TELEMETRY_RECORDS = 500
+# What python-chess parses out of the engine's info lines, chosen per endpoint. Engine moves
+# and /api/evaluate only read the score and WDL (depth, nodes and nps always come along),
+# /api/analyze and /api/search-stream show whole lines. Parsing a PV plays every move of it
+# on a board copy, see info_benchmark.py for what that costs on the Pi. Anytime search watches
+# the main line, so with ANYTIME_ENABLED engine moves parse PVs as well (its 'anytime' profile)
+FAST_PLAY_INFO = chess.engine.INFO_SCORE
+ANALYSIS_INFO = chess.engine.INFO_ALL
+# Progress updates per second sent to /api/search-stream subscribers
+SEARCH_STREAM_RATE = 4.0
+# Memory cap for cached engine replies (bytes)
+ENGINE_CACHE_MAX_BYTES = 8 * 1024 * 1024
+# /api/analyze: default and largest number of lines and think time (seconds), cache cap (bytes)
+ANALYSIS_MULTIPV = 3
+ANALYSIS_MAX_MULTIPV = 5
+ANALYSIS_TIME = 1.0
+ANALYSIS_MAX_TIME = 10.0
+ANALYSIS_CACHE_MAX_BYTES = 2 * 1024 * 1024
+# /api/evaluate: cheap search limits (whichever comes first) and cache cap (bytes)
+EVALUATION_DEPTH = 12
+EVALUATION_NODES = 200000
+EVALUATION_CACHE_MAX_BYTES = 1024 * 1024
+# Most FENs one /api/evaluate-batch request may send
+BATCH_MAX_POSITIONS = 1000
+
+# Engine options used for the current game, applied on every engine checkout
+engine_config = {
+    "Skill Level": 10,
+    "UCI_LimitStrength": True,
+    "UCI_Elo": 1350
+}
+
+# Engine replies for positions we have already searched
+engine_cache = EngineCache(ENGINE_CACHE_MAX_BYTES)
+# Analysis lines for positions the GUI has already asked about
+analysis_cache = EngineCache(ANALYSIS_CACHE_MAX_BYTES)
+# Score and WDL for positions the eval bar has already shown
+evaluation_cache = EngineCache(EVALUATION_CACHE_MAX_BYTES)
+# Totals for /api/evaluate-batch, reported on /api/status
+batch_stats = {'batches': 0, 'positions': 0, 'last_positions_per_second': None}
+batch_stats_lock = threading.Lock()
+# Live progress of the engine's move search for the GUI
+search_stream = SearchStream(SEARCH_STREAM_RATE)
+# Nodes per second on this Pi, turns think times into node budgets
+node_budget = NodeBudget(NODE_CALIBRATION_PATH)
+node_calibration_lock = threading.Lock()
+# Depth, nodes, nps, hashfull and wall time of recent engine move searches
+search_telemetry = SearchTelemetry(TELEMETRY_RECORDS)
+# How game_speed becomes a search limit for the current game
+search_mode = SEARCH_MODE
+# Shallow search with noise for the beginner levels, beginner_elo is set while one is being played
+beginner_engine = BeginnerEngine(max_nodes=BEGINNER_MAX_NODES, max_time=BEGINNER_MAX_TIME) if BEGINNER_ENABLED else None
+beginner_elo = None
+# Weakening used for the current game, and the sampler for the 'sampling' model
+strength_model = STRENGTH_MODEL
+strength_sampler = SamplingStrength(STRENGTH_SAMPLING_MULTIPV)
+# Forced moves, mates in one and obvious recaptures, answered before the engine
+move_triage = MoveTriage(TRIAGE_RECAPTURE, TRIAGE_RECAPTURE_MIN_VALUE) if TRIAGE_ENABLED else None
+# Engine move searches that stop once the best move settles
+anytime_search = AnytimeSearch(ANYTIME_STABLE_DEPTHS, ANYTIME_MIN_DEPTH, ANYTIME_SCORE_MARGIN,
+                               ANYTIME_MAX_TIME) if ANYTIME_ENABLED else None
+
+# Polyglot opening book, probed before the engine is asked
+OPENING_BOOK_ENABLED = True
+BOOK_BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'books'))
+OPENING_BOOK_PATH = os.path.join(BOOK_BASE_DIR, 'opening.bin')
+opening_book = OpeningBook(OPENING_BOOK_PATH) if OPENING_BOOK_ENABLED else None
+if opening_book and not opening_book.available():
+    print(f"Warning: opening book not found at {OPENING_BOOK_PATH}, engine will play every move")
+    opening_book = None
+# Each NNUE personality's own book (BOOK_BASE_DIR/<model>.bin, built by book_builder.py)
+# is used in place of the generic one while that personality is playing
+PERSONALITY_BOOKS_ENABLED = True
+personality_books = {}
+personality_books_lock = threading.Lock()
+
+# Syzygy endgame tables, probed when few enough pieces are left
+SYZYGY_ENABLED = True
+SYZYGY_PATH = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'syzygy'))
+endgame_tablebase = EndgameTablebase(SYZYGY_PATH) if SYZYGY_ENABLED else None
+if endgame_tablebase and not endgame_tablebase.open():
+    print(f"Warning: no Syzygy tables found at {SYZYGY_PATH}, endgames will use the engine")
+    endgame_tablebase = None
+
+# NNUE file paths (absolute paths, NNUE_MODELS maps each personality to its network)
+CARLSEN_NNUE_PATH = NNUE_MODELS['carlsen']
+
+# Personality networks kept loaded in idle engines so switching does not wait for a reload
+NNUE_WARM_ENGINES = 2
+NNUE_MEMORY_BUDGET = 256 * 1024 * 1024
+NNUE_PRELOAD_MODELS = ['carlsen']
+
+# Threads and Hash for every engine, preloaded NNUE networks come out of the engines' memory
+engine_resources = ResourceBudget(ENGINE_RESERVED_CORES, ENGINE_RESERVED_MEMORY + NNUE_MEMORY_BUDGET)
 
 # Create Socket Port
 HOST = "127.0.0.1"
@@ -52,21 +217,300 @@ s2.sendall(b"draw\n")
 global_win_counter = 0;
 
 def initialize_engine():
-    """Initialize the Stockfish chess engine"""
-    global engine
+    """Initialize the pool of Stockfish chess engines"""
+    global engine_pool, ponderer, speculator, personalities, engine_warmup
     try:
-        engine = chess.engine.SimpleEngine.popen_uci("/usr/games/stockfish")
-        engine.configure({
-            "Skill Level": 10,
-            "UCI_LimitStrength": True,
-            "UCI_Elo": 1350
-        })
+        if ponderer:
+            ponderer.new_game()
+            ponderer = None
+        if speculator:
+            speculator.clear()
+            speculator = None
+        if engine_pool:
+            engine_pool.close()
+        engine_pool = EnginePool(STOCKFISH_PATH, ENGINE_POOL_SIZE, engine_config,
+                                 standby=ENGINE_STANDBY, resources=engine_resources)
+        if not engine_pool.start():
+            engine_pool = None
+            return False
+        engine_pool.start_watchdog(ENGINE_WATCHDOG_INTERVAL)
+        if PONDER_ENABLED and engine_pool.size > 1:
+            ponderer = Ponderer(engine_pool)
+        if SPECULATION_ENABLED and engine_pool.size > 1:
+            speculator = Speculator(engine_pool, SPECULATION_TOP_K, SPECULATION_PREDICT_TIME)
+        personalities = PersonalityEngines(engine_pool, NNUE_WARM_ENGINES, NNUE_MEMORY_BUDGET)
+        personalities.preload([{**engine_config, "EvalFile": NNUE_MODELS[model]}
+                               for model in NNUE_PRELOAD_MODELS if os.path.exists(NNUE_MODELS[model])])
+        if ENGINE_WARMUP_ENABLED:
+            engine_warmup = EngineWarmup(engine_pool, ENGINE_WARMUP_SEARCH_TIME, ENGINE_CHECKOUT_TIMEOUT)
+            engine_warmup.run(engine_config)
+        if SEARCH_MODE == 'nodes':
+            calibrate_node_budget()
         print("Chess engine initialized successfully")
         return True
     except Exception as e:
         print(f"Failed to initialize chess engine: {e}")
         return False
 
+def calibrate_node_budget():
+    """Make sure node_budget is calibrated for the engines' current Threads, returns False if it cannot be
+    Calibrates (a few seconds) when it is not, e.g. after the pool rebalanced Threads
+    """
+    with node_calibration_lock:
+        threads = engine_pool.effective_config().get("Threads", 1)
+        if node_budget.calibrated_for(threads):
+            return True
+        try:
+            node_budget.calibrate(engine_pool, engine_config, timeout=ENGINE_CHECKOUT_TIMEOUT)
+        except Exception as e:
+            print(f"Node calibration failed, searching by time: {e}")
+            return False
+        return True
+
+def reconfigure_engines(config):
+    """Load the new personality network and warm an engine up with config, off the request path"""
+    if engine_warmup:
+        # Move requests wait for this instead of racing it
+        engine_warmup.ready.clear()
+
+    def run():
+        if personalities:
+            personalities.switch(config)
+        if engine_warmup:
+            engine_warmup.run(config, engines=1)
+
+    threading.Thread(target=run, daemon=True).start()
+
+def play_engine(limit):
+    """Run engine.play on the current board, on the pondering engine when pondering is on
+    While the GUI is watching /api/search-stream the search runs with engine.analysis instead
+    so its progress can be streamed, that move is not pondered on
+    With anytime search on the search stops early once its best move is stable, not pondered either
+    If the engine dies mid-search the search is retried once on its replacement
+    """
+    for attempt in range(2):
+        try:
+            if strength_model == 'sampling':
+                # Full strength search, the sampler does the weakening
+                with engine_pool.checkout(analysis_config(), timeout=ENGINE_CHECKOUT_TIMEOUT) as engine:
+                    # The sampler needs each line's first move as well as its score
+                    return strength_sampler.play(engine, board, limit, engine_config.get("UCI_Elo", 1350),
+                                                 info=FAST_PLAY_INFO | chess.engine.INFO_PV)
+            if search_stream.has_subscribers():
+                if ponderer:
+                    ponderer.stop()
+                with engine_pool.checkout(engine_config, timeout=ENGINE_CHECKOUT_TIMEOUT) as engine:
+                    return search_stream.play(engine, board, limit, info=ANALYSIS_INFO)
+            if anytime_search:
+                if ponderer:
+                    return ponderer.play_anytime(board, limit, engine_config, anytime_search,
+                                                 info=FAST_PLAY_INFO, timeout=ENGINE_CHECKOUT_TIMEOUT)
+                with engine_pool.checkout(engine_config, timeout=ENGINE_CHECKOUT_TIMEOUT) as engine:
+                    return anytime_search.play(engine, board, limit, info=FAST_PLAY_INFO)
+            if ponderer:
+                return ponderer.play(board, limit, engine_config, info=FAST_PLAY_INFO,
+                                     timeout=ENGINE_CHECKOUT_TIMEOUT)
+            with engine_pool.checkout(engine_config, timeout=ENGINE_CHECKOUT_TIMEOUT) as engine:
+                return engine.play(board, limit, info=FAST_PLAY_INFO)
+        except chess.engine.EngineTerminatedError as e:
+            # The pool has already swapped the standby engine in for the dead one
+            if attempt:
+                raise
+            print(f"Engine died during search ({e}), retrying on the standby engine")
+
+def move_without_search(limit, cache_key):
+    """The reply from the stages before the Stockfish search, (move, wdl_stats, source) or None
+    cache_key is None when replies must not come from the cache
+    """
+    # Beginner levels never reach Stockfish (or the tables and book, which play too well)
+    if beginner_elo is not None:
+        move, _ = beginner_engine.play(board, beginner_elo)
+        return move, None, 'beginner'
+
+    # Nothing to search: the only legal move, a mate, or an obvious recapture
+    if move_triage:
+        hit = move_triage.probe(board)
+        if hit:
+            move, kind = hit
+            wdl_stats = None
+            if kind == 'mate':
+                wdl_stats = wdl_percentages(chess.engine.PovWdl(chess.engine.Wdl(1000, 0, 0), board.turn))
+            return move, wdl_stats, kind
+
+    # Endgame tablebase: perfect move and the exact result
+    if endgame_tablebase:
+        hit = endgame_tablebase.probe(board)
+        if hit:
+            move, tablebase_wdl = hit
+            # Cursed wins and blessed losses are draws under the 50 move rule
+            outcome = {2: (1000, 0, 0), -2: (0, 0, 1000)}.get(tablebase_wdl, (0, 1000, 0))
+            wdl_stats = wdl_percentages(chess.engine.PovWdl(chess.engine.Wdl(*outcome), board.turn))
+            return move, wdl_stats, 'tablebase'
+
+    # Opening book, the personality's own one when it has been built
+    book = personality_book(engine_config)
+    if book:
+        move = book.probe(board)
+        if move:
+            return move, None, 'book'
+
+    # Answer searched while the human was thinking, they played one of the predicted moves
+    if speculator:
+        hit = speculator.take(board, engine_config, limit)
+        if hit:
+            return hit['move'], hit['wdl'], 'speculation'
+
+    # Same position with the same settings already searched, reuse the reply
+    cached = engine_cache.get(cache_key) if cache_key else None
+    if cached:
+        return cached['move'], cached['wdl'], 'cache'
+    return None
+
+def choose_move(limit):
+    """Pick the engine's reply for the current board
+    Returns (move, wdl_stats, source), source says which stage answered
+    """
+    # Sampled moves are meant to vary, they are never cached
+    sampling = strength_model == 'sampling'
+    cache_key = position_key(board, engine_config, *limit_key(limit))
+    answer = move_without_search(limit, cache_key if not sampling else None)
+    if answer:
+        # The reserved engine would go on pondering a position this reply has left behind
+        if ponderer:
+            ponderer.stop()
+        return answer
+
+    search_start = time.time()
+    result = play_engine(limit)
+    search_telemetry.record(result.info, personality_name(engine_config), engine_config.get("UCI_Elo"),
+                            limit, time.time() - search_start)
+
+    # Extract the WDL Probabilites
+    wdl_stats = None
+    if 'wdl' in result.info:
+        wdl_stats = wdl_percentages(result.info['wdl'])
+
+    if result.move in board.legal_moves and not sampling:
+        engine_cache.put(cache_key, {'move': result.move, 'san': board.san(result.move), 'wdl': wdl_stats})
+    return result.move, wdl_stats, 'engine'
+
+def analysis_config():
+    """The current engine settings at full strength, analysis should show the best lines"""
+    return {**engine_config, "UCI_LimitStrength": False, "Skill Level": 20, "UCI_ShowWDL": True}
+
+def request_board(data):
+    """Board to analyse: the FEN in the request, otherwise a copy of the game board
+    Raises ValueError for a bad FEN
+    """
+    fen = data.get('fen')
+    if fen:
+        return chess.Board(fen)
+    return board.copy()
+
+def analysis_limit(data):
+    """Search limit from the request's time and depth, capped so one request cannot hold an engine for long"""
+    think_time = max(0.05, min(float(data.get('time', ANALYSIS_TIME)), ANALYSIS_MAX_TIME))
+    depth = data.get('depth')
+    return chess.engine.Limit(time=think_time, depth=max(1, int(depth)) if depth else None)
+
+def evaluate_position(position, limit=None):
+    """Score and WDL for position under limit (the cheap evaluation limit by default), memoized by position hash"""
+    if position.is_game_over():
+        # Nothing to search, the result is the evaluation
+        outcome = {'1-0': (1000, 0, 0), '0-1': (0, 0, 1000)}.get(position.result(), (0, 1000, 0))
+        wdl = chess.engine.PovWdl(chess.engine.Wdl(*outcome), chess.WHITE)
+        return {'score': None, 'wdl': wdl_percentages(wdl), 'depth': 0, 'nodes': 0}, False
+
+    if limit is None:
+        limit = chess.engine.Limit(depth=EVALUATION_DEPTH, nodes=EVALUATION_NODES)
+    config = analysis_config()
+    cache_key = position_key(position, config, 'evaluate', *limit_key(limit))
+    evaluation = evaluation_cache.get(cache_key)
+    if evaluation:
+        return evaluation, True
+
+    with engine_pool.checkout(config, timeout=ENGINE_CHECKOUT_TIMEOUT) as engine:
+        info = engine.analyse(position, limit, info=FAST_PLAY_INFO)
+    evaluation = {
+        'score': score_json(info['score']) if 'score' in info else None,
+        'wdl': wdl_percentages(info['wdl']) if 'wdl' in info else None,
+        'depth': info.get('depth'),
+        'nodes': info.get('nodes')
+    }
+    evaluation_cache.put(cache_key, evaluation)
+    return evaluation, False
+
+def batch_request():
+    """FENs and the shared limit of a batch request
+    The body is JSON with a 'fens' list, or NDJSON with one FEN (or {"fen": ...}) per line
+    and the limit in the query string
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        data = request.args
+        fens = []
+        for line in request.get_data(as_text=True).splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line) if line[0] in '{"' else line
+            fens.append(item.get('fen') if isinstance(item, dict) else item)
+    else:
+        data = request.get_json(silent=True) or {}
+        fens = data.get('fens') or []
+    if not isinstance(fens, list) or not fens:
+        raise ValueError('no FENs in the request')
+    if len(fens) > BATCH_MAX_POSITIONS:
+        raise ValueError(f'at most {BATCH_MAX_POSITIONS} FENs per request')
+
+    depth = data.get('depth')
+    nodes = data.get('nodes')
+    think_time = data.get('time')
+    if not (depth or nodes or think_time):
+        depth, nodes = EVALUATION_DEPTH, EVALUATION_NODES
+    limit = chess.engine.Limit(
+        depth=max(1, int(depth)) if depth else None,
+        nodes=max(1, int(nodes)) if nodes else None,
+        time=max(0.01, min(float(think_time), ANALYSIS_MAX_TIME)) if think_time else None
+    )
+    return fens, limit
+
+def evaluate_batch_item(index, fen, limit):
+    """One NDJSON result line for the batch endpoint"""
+    try:
+        position = chess.Board(fen)
+        evaluation, cached = evaluate_position(position, limit)
+        return {'index': index, 'fen': position.fen(), **evaluation, 'cached': cached}
+    except Exception as e:
+        return {'index': index, 'fen': fen, 'error': str(e)}
+
+def personality_name(config):
+    """NNUE model name for config's EvalFile, 'stockfish' for the built-in network"""
+    eval_file = config.get("EvalFile")
+    for model, path in NNUE_MODELS.items():
+        if path == eval_file:
+            return model
+    return os.path.basename(eval_file) if eval_file else 'stockfish'
+
+def personality_book(config):
+    """Opening book for config's NNUE personality, the generic book when it has none"""
+    if not OPENING_BOOK_ENABLED or not PERSONALITY_BOOKS_ENABLED:
+        return opening_book
+    name = personality_name(config)
+    with personality_books_lock:
+        if name not in personality_books:
+            # Missing books are looked for again next time, book_builder.py may have written one since
+            book = OpeningBook(os.path.join(BOOK_BASE_DIR, f'{name}.bin'))
+            if not book.available():
+                return opening_book
+            personality_books[name] = book
+            print(f"Opening book for {name}: {book.path}")
+        return personality_books[name]
+
+def personality_book_stats():
+    """Hit counters of the personality books loaded so far"""
+    with personality_books_lock:
+        return {name: book.stats() for name, book in personality_books.items()}
+
 def get_board_state():
     """Get current board state as a dictionary"""
     board_state = {}
@@ -120,8 +564,7 @@ def get_engine_move(game_speed=10):
                    Thinking time = 2.0 / game_speed seconds
     """
     global global_win_counter
-    global wdl
-    if not engine:
+    if not engine_pool:
         print("Engine not initialized")
         return None
         
@@ -152,24 +595,25 @@ def get_engine_move(game_speed=10):
         # Use a timeout limit to prevent hanging (max 30 seconds total)
         time_limit = min(thinking_time * 2, 30.0)
         
-        result = engine.play(board, chess.engine.Limit(time=thinking_time), info=chess.engine.Info.ALL)
-        move = result.move
-        info = result.info
-
+        # Clock games get a budget from the remaining time instead of the game speed
+        if game_clock:
+            limit = game_clock.limit(board)
+            print(f"Clock: {game_clock.state()}, Think time budget: {limit.time:.2f}s")
+        elif search_mode == 'nodes' and calibrate_node_budget():
+            # Same search however busy the Pi is, time_limit only stops a search that hangs
+            limit = chess.engine.Limit(nodes=node_budget.nodes(thinking_time), time=time_limit)
+            print(f"Node budget: {limit.nodes} nodes")
+        else:
+            limit = chess.engine.Limit(time=thinking_time)
 
-        # Extract the WDL Probabilites
-        if 'wdl' in info:
-            wdl = info['wdl'].white()
-            total = wdl.wins + wdl.draws + wdl.losses
+        # Do not race a warm-up that is still running (the beginner engine does not need one)
+        if engine_warmup and beginner_elo is None and not engine_warmup.ready.wait(ENGINE_WARMUP_TIMEOUT):
+            print("Warning: engine warm-up still running, searching anyway")
 
-            
-            # Return the win loss and draw probabilities based on state of board
-            if total > 0:
-                wdl_stats = {
-                    'win': round((wdl.wins / total) * 100, 1), 
-                    'draw': round((wdl.draws / total) * 100, 1),
-                    'loss': round((wdl.losses / total) * 100, 1)
-                }
+        search_start = time.time()
+        move, wdl_stats, source = choose_move(limit)
+        if engine_warmup and source == 'engine':
+            engine_warmup.record_move(time.time() - search_start)
         
         print(f"Engine suggested move: {move}")
         
@@ -185,34 +629,28 @@ def get_engine_move(game_speed=10):
         
         # Make the move
         board.push(move)                    
-        try:
-            return {
-                'from': chess.square_name(move.from_square),
-                'to': chess.square_name(move.to_square),
-                'piece': piece,
-                'san': san_notation,
-                'wdl': wdl_stats
-            }
-        except:
-            return {
-                'from': chess.square_name(move.from_square),
-                'to': chess.square_name(move.to_square),
-                'piece': piece,
-                'san': san_notation,
-                'wdl': None
-            }
+        if game_clock:
+            game_clock.press(not board.turn)
+        engine_move = {
+            'from': chess.square_name(move.from_square),
+            'to': chess.square_name(move.to_square),
+            'piece': piece,
+            'san': san_notation,
+            'wdl': wdl_stats,
+            'source': source
+        }
+        # Stream subscribers get the move before the LED/LCD and HTTP round trips
+        search_stream.publish('move', engine_move)
+        # Search the answers to the human's likely replies while they think
+        if speculator and strength_model == 'uci' and beginner_elo is None and not board.is_game_over():
+            speculator.start(board, engine_config, limit, game_clock)
+        return engine_move
 
         
     except chess.engine.EngineTerminatedError as e:
+        # The pool has already replaced the dead engine, so the caller can retry
         print(f"ERROR: Engine terminated unexpectedly: {e}")
-        print("Attempting to reinitialize engine...")
-        # Try to reinitialize the engine
-        if initialize_engine():
-            print("Engine reinitialized successfully")
-            return None  # Return None so caller can retry
-        else:
-            print("Failed to reinitialize engine")
-            return None
+        return None
     except Exception as e:
         print(f"Engine move error: {e}")
         import traceback
@@ -222,14 +660,197 @@ def get_engine_move(game_speed=10):
 @app.route('/api/status', methods=['GET'])
 def status():
     """Check server status"""
+    with batch_stats_lock:
+        batch_evaluation = dict(batch_stats)
     return jsonify({
         'status': 'running',
-        'engine_connected': engine is not None,
+        'engine_connected': engine_pool is not None,
+        'ready': engine_warmup.ready.is_set() if engine_warmup else engine_pool is not None,
+        'warmup': engine_warmup.stats() if engine_warmup else None,
+        'engine_pool': engine_pool.stats() if engine_pool else None,
+        'resources': engine_resources.stats(),
+        'ponder': ponderer.stats() if ponderer else None,
+        'speculation': speculator.stats() if speculator else None,
+        'engine_cache': engine_cache.stats(),
+        'analysis_cache': analysis_cache.stats(),
+        'evaluation_cache': evaluation_cache.stats(),
+        'batch_evaluation': batch_evaluation,
+        'search_mode': search_mode,
+        'strength_model': strength_model,
+        'strength_sampling': strength_sampler.stats(),
+        'node_budget': node_budget.stats(),
+        'telemetry': search_telemetry.stats(),
+        'beginner': {'elo': beginner_elo, **beginner_engine.stats()} if beginner_engine else None,
+        'search_stream': search_stream.stats(),
+        'anytime_search': anytime_search.stats() if anytime_search else None,
+        'triage': move_triage.stats() if move_triage else None,
+        'opening_book': opening_book.stats() if opening_book else None,
+        'personality_books': personality_book_stats(),
+        'tablebase': endgame_tablebase.stats() if endgame_tablebase else None,
+        'personalities': personalities.stats() if personalities else None,
         'game_active': game_active,
         'current_player': current_player,
         'board_fen': board.fen()
     })
 
+@app.route('/api/analyze', methods=['POST'])
+def analyze():
+    """Ranked candidate lines (MultiPV) for the current position or a FEN"""
+    try:
+        if not engine_pool:
+            return jsonify({
+                'status': 'error',
+                'message': 'Engine not initialized'
+            }), 500
+
+        data = request.get_json(silent=True) or {}
+        try:
+            position = request_board(data)
+            limit = analysis_limit(data)
+            multipv = max(1, min(int(data.get('multipv', ANALYSIS_MULTIPV)), ANALYSIS_MAX_MULTIPV))
+        except (ValueError, TypeError) as e:
+            return jsonify({
+                'status': 'error',
+                'message': f'Invalid analysis request: {str(e)}'
+            }), 400
+
+        if position.is_game_over():
+            return jsonify({
+                'status': 'error',
+                'message': 'Game is over, nothing to analyse'
+            }), 400
+
+        # The GUI asks again every time the user looks at a position, search it once
+        config = analysis_config()
+        cache_key = position_key(position, config, 'analyze', multipv, *limit_key(limit))
+        lines = analysis_cache.get(cache_key)
+        cached = lines is not None
+        if not cached:
+            with engine_pool.checkout(config, timeout=ENGINE_CHECKOUT_TIMEOUT) as engine:
+                infos = engine.analyse(position, limit, multipv=multipv, info=ANALYSIS_INFO)
+            lines = [format_line(position, info) for info in infos]
+            analysis_cache.put(cache_key, lines)
+
+        return jsonify({
+            'status': 'success',
+            'fen': position.fen(),
+            'multipv': multipv,
+            'lines': lines,
+            'cached': cached
+        })
+
+    except Exception as e:
+        print(f"Exception in analyze: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'status': 'error',
+            'message': f'Analysis error: {str(e)}'
+        }), 500
+
+@app.route('/api/search-stream', methods=['GET'])
+def search_stream_endpoint():
+    """Server-Sent Events with the engine's search progress and its move as soon as it is chosen"""
+    return Response(search_stream.stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/evaluate', methods=['GET', 'POST'])
+def evaluate():
+    """Score and WDL for the current position or a FEN, without making a move"""
+    try:
+        if not engine_pool:
+            return jsonify({
+                'status': 'error',
+                'message': 'Engine not initialized'
+            }), 500
+
+        data = request.get_json(silent=True) or request.args
+        try:
+            position = request_board(data)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': f'Invalid FEN: {str(e)}'
+            }), 400
+
+        evaluation, cached = evaluate_position(position)
+        return jsonify({
+            'status': 'success',
+            'fen': position.fen(),
+            **evaluation,
+            'cached': cached
+        })
+
+    except Exception as e:
+        print(f"Exception in evaluate: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'status': 'error',
+            'message': f'Evaluation error: {str(e)}'
+        }), 500
+
+@app.route('/api/evaluate-batch', methods=['POST'])
+def evaluate_batch():
+    """Evaluate many FENs across every engine in the pool, streaming NDJSON results as they finish"""
+    if not engine_pool:
+        return jsonify({
+            'status': 'error',
+            'message': 'Engine not initialized'
+        }), 500
+
+    try:
+        fens, limit = batch_request()
+    except (ValueError, TypeError) as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Invalid batch request: {str(e)}'
+        }), 400
+
+    # One worker per engine, always leaving one engine for the game's moves (the pondering engine
+    # when pondering), so /api/engine-move never queues behind a batch
+    workers = max(1, engine_pool.size - 1)
+
+    def results():
+        start = time.time()
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = [executor.submit(evaluate_batch_item, index, fen, limit) for index, fen in enumerate(fens)]
+            # Lines go out in the order positions finish, the index says which input each one is
+            for future in as_completed(futures):
+                yield json.dumps(future.result()) + "\n"
+        finally:
+            # A client that disconnects mid-stream closes this generator, the positions not started are dropped
+            executor.shutdown(wait=False, cancel_futures=True)
+        elapsed = time.time() - start
+        positions_per_second = round(len(fens) / elapsed, 2) if elapsed > 0 else None
+        with batch_stats_lock:
+            batch_stats['batches'] += 1
+            batch_stats['positions'] += len(fens)
+            batch_stats['last_positions_per_second'] = positions_per_second
+        yield json.dumps({
+            'done': True,
+            'positions': len(fens),
+            'workers': workers,
+            'seconds': round(elapsed, 3),
+            'positions_per_second': positions_per_second
+        }) + "\n"
+
+    return Response(results(), mimetype='application/x-ndjson')
+
+@app.route('/api/telemetry', methods=['GET'])
+def telemetry():
+    """Percentiles of recent engine searches per personality and Elo, plus the latest records"""
+    try:
+        count = max(0, int(request.args.get('recent', 20)))
+    except ValueError:
+        count = 20
+    return jsonify({
+        'status': 'success',
+        'summary': search_telemetry.summary(),
+        'recent': search_telemetry.recent(count)
+    })
+
 # Debug and retrieve data from the server
 @app.route('/api/debug', methods=['GET'])
 def debug_info():
@@ -290,6 +911,15 @@ def handle_move():
         
         # Make the move
         if make_move(from_square, to_square):
+            if game_clock:
+                game_clock.press(not board.turn)
+
+            # Tell the pondering engine whether it guessed the human's move
+            if ponderer:
+                ponderer.human_moved(board.peek())
+            if speculator:
+                speculator.human_moved(board.peek())
+
             # Check if game is over
             game_over = board.is_game_over()
             winner = None
@@ -330,7 +960,8 @@ def handle_move():
                 'board_state': get_board_state(),
                 'game_over': game_over,
                 'winner': winner,
-                'current_player': 'black' if current_player == 'white' else 'white'
+                'current_player': 'black' if current_player == 'white' else 'white',
+                'clock': game_clock.state() if game_clock else None
             })
         else:
             return jsonify({
@@ -353,7 +984,7 @@ def handle_engine_move():
     """Get the engine's move"""
     global global_win_counter
     try:
-        if not engine:
+        if not engine_pool:
             # Try to reinitialize engine
             print("Engine not initialized, attempting to reinitialize...")
             if initialize_engine():
@@ -454,26 +1085,11 @@ def handle_engine_move():
                 'engine_move': engine_move,
                 'board_state': get_board_state(),
                 'game_over': game_over,
-                'winner': winner
+                'winner': winner,
+                'clock': game_clock.state() if game_clock else None
             })
         else:
-            # If engine move failed, try to check if engine is still alive
-            try:
-                # Quick health check
-                test_result = engine.ping()
-                if test_result is None:
-                    raise Exception("Engine ping failed")
-            except Exception as e:
-                print(f"Engine health check failed: {e}")
-                # Try to reinitialize
-                if initialize_engine():
-                    print("Engine reinitialized after health check failure")
-                else:
-                    return jsonify({
-                        'status': 'error',
-                        'message': 'Engine failed and could not be reinitialized'
-                    }), 500
-            
+            # Dead engines are replaced by the pool and its watchdog, the GUI can just ask again
             return jsonify({
                 'status': 'error',
                 'message': 'Failed to get engine move (engine may be busy or unresponsive)'
@@ -527,7 +1143,8 @@ def get_board_state_endpoint():
             'current_player': current_player,
             'game_over': game_over,
             'winner': winner,
-            'board_fen': board.fen()
+            'board_fen': board.fen(),
+            'clock': game_clock.state() if game_clock else None
         })
     except Exception as e:
         print(f"Error getting board state: {e}")
@@ -546,9 +1163,15 @@ def game_control():
         command = data.get('command')
         
         if command == 'reset':
-            global board, game_active, current_player
+            global board, game_active, current_player, game_clock
             board = chess.Board()
+            if game_clock:
+                game_clock = GameClock(game_clock.base, game_clock.increment)
             current_player = 'white'
+            if ponderer:
+                ponderer.new_game()
+            if speculator:
+                speculator.clear()
             
             return jsonify({
                 'status': 'success',
@@ -587,13 +1210,18 @@ def set_bot_difficulty():
     """Set bot difficulty level (ELO and skill) and optionally configure NNUE"""
     global global_win_counter
     global board
+    global engine_config
+    global game_clock
+    global search_mode
+    global beginner_elo
+    global strength_model
     
     #  Reset win back to zero
     if board.result() == "*":
         global_win_counter = 0;
         
     try:
-        if not engine:
+        if not engine_pool:
             return jsonify({
                 'status': 'error',
                 'message': 'Engine not initialized'
@@ -604,7 +1232,16 @@ def set_bot_difficulty():
         skill = data.get('skill', 10)
         use_nnue = data.get('use_nnue', False)
         nnue_model = data.get('nnue_model', 'carlsen')  
+        # Optional time control in seconds, without one the GUI's game_speed decides think time
+        base_time = data.get('base_time')
+        increment = data.get('increment', 0)
+        # 'nodes' or 'time', how game_speed becomes a search limit when there is no clock
+        requested_mode = data.get('search_mode', SEARCH_MODE)
+        # 'uci' or 'sampling', how Stockfish is weakened to the Elo
+        requested_model = data.get('strength_model', STRENGTH_MODEL)
         
+        # Levels under Stockfish's range go to the beginner engine
+        beginner_elo = max(BEGINNER_MIN_ELO, elo) if beginner_engine and elo < 1350 else None
         # Ensure ELO is within Stockfish's supported range (1350-2850)
         elo = max(1350, min(2850, elo))
         skill = max(0, min(20, skill))
@@ -619,23 +1256,8 @@ def set_bot_difficulty():
         
         # If NNUE is requested, configure the evaluation file
         if use_nnue:
-            # Select the appropriate NNUE file based on model
-            if nnue_model == 'fischer':
-                nnue_path = FISCHER_NNUE_PATH
-            elif nnue_model == 'yifan':
-                nnue_path = YIFAN_NNUE_PATH
-            elif nnue_model == 'spassky':
-                nnue_path = SPASSKY_NNUE_PATH
-            elif nnue_model == 'nakamura':
-                nnue_path = NAKAMURA_NNUE_PATH
-            elif nnue_model == 'krush':
-                nnue_path = KRUSH_NNUE_PATH
-            elif nnue_model == 'polgar':
-                nnue_path = POLGAR_NNUE_PATH
-            elif nnue_model == 'anand':
-                nnue_path = ANAND_NNUE_PATH
-            else:  # default to carlsen
-                nnue_path = CARLSEN_NNUE_PATH
+            # Select the appropriate NNUE file based on model, default to carlsen
+            nnue_path = NNUE_MODELS.get(nnue_model, CARLSEN_NNUE_PATH)
             
             if os.path.exists(nnue_path):
                 config["EvalFile"] = nnue_path
@@ -643,22 +1265,44 @@ def set_bot_difficulty():
             else:
                 print(f"Warning: NNUE file not found at {nnue_path}, using default evaluation")
         
-        engine.configure(config)
+        # Engines pick the new settings up the next time they are checked out,
+        # searches already running keep the settings they started with
+        engine_config = config
+        reconfigure_engines(config)
+        search_mode = requested_mode if requested_mode in ('nodes', 'time') else SEARCH_MODE
+        warning = None
+        if search_mode == 'nodes' and not calibrate_node_budget():
+            search_mode = 'time'
+            warning = 'Node calibration failed, this game searches by time'
+        strength_model = requested_model if requested_model in ('uci', 'sampling') else STRENGTH_MODEL
         
         # Reset the board to starting position when setting difficulty
         board = chess.Board()
+        game_clock = GameClock(float(base_time), float(increment)) if base_time else None
+        if ponderer:
+            ponderer.new_game()
+        if speculator:
+            speculator.clear()
         
         nnue_status = f"with NNUE ({nnue_model})" if use_nnue else "standard evaluation"
-        print(f"Bot difficulty set: ELO {elo}, Skill Level {skill}, {nnue_status}")
+        reported_elo = elo
+        if beginner_elo is not None:
+            nnue_status = "beginner engine"
+            reported_elo = beginner_elo
+        print(f"Bot difficulty set: ELO {reported_elo}, Skill Level {skill}, {nnue_status}")
         print(f"Board reset to starting position")
         
         return jsonify({
             'status': 'success',
-            'message': f'Bot difficulty set: ELO {elo}, Skill Level {skill}, {nnue_status}',
-            'elo': elo,
+            'message': f'Bot difficulty set: ELO {reported_elo}, Skill Level {skill}, {nnue_status}',
+            'elo': reported_elo,
+            'beginner': beginner_elo is not None,
             'skill': skill,
             'nnue_enabled': use_nnue,
             'nnue_model': nnue_model if use_nnue else None,
+            'search_mode': search_mode,
+            'strength_model': strength_model,
+            'warning': warning,
             'board_state': get_board_state()
         })
         
@@ -692,10 +1336,21 @@ def trigger_loss():
     
 def cleanup():
     """Cleanup resources"""
-    global engine
-    if engine:
-        engine.quit()
+    global engine_pool
+    if ponderer:
+        ponderer.new_game()
+    if speculator:
+        speculator.clear()
+    if engine_pool:
+        engine_pool.close()
         print("Chess engine closed")
+    if opening_book:
+        opening_book.close()
+    with personality_books_lock:
+        for book in personality_books.values():
+            book.close()
+    if endgame_tablebase:
+        endgame_tablebase.close()
     
 if __name__ == '__main__':
     print("="*60)
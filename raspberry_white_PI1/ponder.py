@@ -0,0 +1,166 @@
+"""
+Pondering
+Keeps one engine from the pool reserved for the current game so it can keep
+thinking on the human's clock.
+
+After the engine plays, python-chess leaves it searching the position after
+the reply it expects from the human (the ponder move). If the human plays
+that move the search is promoted with "ponderhit" and the time already spent
+counts towards the reply. If the human plays something else the ponder search
+is stopped straight away and the next request searches from scratch.
+
+play_anytime() does the same for anytime searches, which need the engine's
+info stream: the ponder search is an engine.analysis of the expected
+position, and on a hit the anytime search takes it over where it is.
+"""
+
+import threading
+import time
+
+import chess.engine
+
+
+class Ponderer:
+    def __init__(self, pool):
+        self.pool = pool
+        # One caller at a time drives the reserved engine, held for the whole search
+        self._search_lock = threading.Lock()
+        # Only the expected move and the counters, so stats() never waits for a search
+        self._lock = threading.Lock()
+        self.engine = None
+        self.config = None
+        # python-chess only sends ponderhit for the same game object, a new one means ucinewgame
+        self.game = object()
+        self.expected = None
+        # Ponder search of play_anytime(), and the position it is on
+        self._analysis = None
+        self._analysis_fen = None
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+
+    def _reserve(self, config, timeout):
+        # The pool's own options count too, a rebalance changes Threads and Hash under the reserved engine
+        config = self.pool.effective_config(config)
+        if self.engine is not None and config != self.config:
+            # Settings changed, the reserved engine has the old ones
+            self._release()
+        if self.engine is None:
+            self.engine = self.pool.acquire(config, timeout)
+            self.config = config
+
+    def _set_expected(self, move):
+        with self._lock:
+            self.expected = move
+
+    def play(self, board, limit, config, info=chess.engine.INFO_NONE, timeout=None):
+        """engine.play on the reserved engine, leaving it pondering afterwards"""
+        with self._search_lock:
+            if self._analysis is not None:
+                self._stop_search()
+            self._reserve(config, timeout)
+            self._set_expected(None)
+            try:
+                result = self.engine.play(board, limit, info=info, ponder=True, game=self.game)
+            except chess.engine.EngineTerminatedError:
+                self.pool.release(self.engine, dead=True)
+                self.engine = None
+                raise
+            self._set_expected(result.ponder)
+            return result
+
+    def play_anytime(self, board, limit, config, anytime, info=chess.engine.INFO_SCORE, timeout=None):
+        """anytime.play on the reserved engine, continuing the ponder search on a hit and
+        leaving it pondering afterwards
+        """
+        info |= chess.engine.INFO_SCORE | chess.engine.INFO_PV
+        with self._search_lock:
+            analysis = None
+            # human_moved() clears expected on a hit and stops the ponder search on a miss
+            if (self._analysis is not None and self.expected is None
+                    and self._analysis_fen == board.fen() and self.pool.effective_config(config) == self.config):
+                analysis = self._analysis
+                self._analysis = None
+            elif self._analysis is not None:
+                self._stop_search()
+            self._reserve(config, timeout)
+            self._set_expected(None)
+            try:
+                if analysis is not None:
+                    # Ponder hit: the engine was told no limit, follow() holds it to this one from now
+                    result = anytime.follow(analysis, limit, start=time.time())
+                else:
+                    result = anytime.play(self.engine, board, limit, info=info)
+                if result.move and result.ponder:
+                    position = board.copy()
+                    position.push(result.move)
+                    position.push(result.ponder)
+                    if not position.is_game_over():
+                        self._analysis = self.engine.analysis(position, info=info)
+                        self._analysis_fen = position.fen()
+                        self._set_expected(result.ponder)
+            except chess.engine.EngineTerminatedError:
+                self.pool.release(self.engine, dead=True)
+                self.engine = None
+                self._analysis = None
+                raise
+            return result
+
+    def human_moved(self, move):
+        """Called with the human's move, stops the ponder search if it guessed wrong"""
+        with self._search_lock:
+            if self.engine is None or self.expected is None:
+                return
+            with self._lock:
+                hit = move == self.expected
+                if hit:
+                    # The next play() on this board is sent to the engine as ponderhit,
+                    # the next play_anytime() takes over the ponder search
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                self.expected = None
+            if not hit:
+                self._stop_search()
+
+    def _stop_search(self):
+        # Any new command cancels the ponder search, ping is the cheapest one
+        self._analysis = None
+        try:
+            self.engine.ping()
+        except chess.engine.EngineTerminatedError:
+            self.pool.release(self.engine, dead=True)
+            self.engine = None
+
+    def _release(self):
+        if self.engine is None:
+            return
+        self._stop_search()
+        if self.engine is not None:
+            self.pool.release(self.engine)
+            self.engine = None
+        self._set_expected(None)
+
+    def stop(self):
+        """Stop pondering and give the engine back, for a move searched some other way"""
+        with self._search_lock:
+            self._release()
+
+    def new_game(self):
+        """Stop pondering and give the engine back, the next game starts with ucinewgame"""
+        with self._search_lock:
+            self._release()
+            self.game = object()
+
+    def stats(self):
+        """Ponder hit/miss counters for /api/status"""
+        with self._lock:
+            guesses = self.hits + self.misses
+            return {
+                'pondering': self.expected is not None,
+                'expected_move': self.expected.uci() if self.expected else None,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / guesses, 3) if guesses else None
+            }
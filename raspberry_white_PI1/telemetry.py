@@ -0,0 +1,80 @@
+"""
+Search Telemetry
+Records what every engine move search actually did (depth, seldepth, nodes,
+nps, hashfull, wall time) next to the limit it was given, in a fixed size
+ring buffer. Summaries group the records by personality and Elo and give
+percentiles, to show whether an NNUE file or a game speed leaves the engine
+too little search on the Pi.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+
+# Record fields that get percentile summaries
+METRICS = ("depth", "seldepth", "nodes", "nps", "hashfull", "wall_ms")
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class SearchTelemetry:
+    def __init__(self, size=500):
+        self._records = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, info, personality, elo, limit, wall_time):
+        """Store one search: the engine's final info, who searched and the limit it had"""
+        entry = {
+            'time': round(time.time(), 3),
+            'personality': personality,
+            'elo': elo,
+            'depth': info.get('depth'),
+            'seldepth': info.get('seldepth'),
+            'nodes': info.get('nodes'),
+            'nps': info.get('nps'),
+            'hashfull': info.get('hashfull'),
+            'wall_ms': round(wall_time * 1000, 1),
+            'limit': {
+                'time': limit.time,
+                'depth': limit.depth,
+                'nodes': limit.nodes,
+                'clock': limit.white_clock is not None or limit.black_clock is not None
+            }
+        }
+        with self._lock:
+            self._records.append(entry)
+
+    def recent(self, count=20):
+        """The last count records, newest last"""
+        with self._lock:
+            return list(self._records)[-count:] if count > 0 else []
+
+    def summary(self):
+        """Percentiles of every metric, one group per personality and Elo"""
+        with self._lock:
+            records = list(self._records)
+        groups = {}
+        for entry in records:
+            groups.setdefault((entry['personality'], entry['elo']), []).append(entry)
+        summary = []
+        for (personality, elo), entries in sorted(groups.items(), key=lambda item: (item[0][0], item[0][1] or 0)):
+            metrics = {}
+            for name in METRICS:
+                values = sorted(entry[name] for entry in entries if entry[name] is not None)
+                metrics[name] = {f'p{pct}': percentile(values, pct) for pct in PERCENTILES}
+            summary.append({'personality': personality, 'elo': elo, 'searches': len(entries), **metrics})
+        return summary
+
+    def stats(self):
+        """Buffer fill for /api/status"""
+        with self._lock:
+            return {'records': len(self._records), 'capacity': self._records.maxlen}